@@ -2,6 +2,8 @@
 ASGI config for alx_backend_graphql_crm project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Served this way (e.g. ``uvicorn alx_backend_graphql_crm.asgi:application``),
+``/graphql/async`` executes queries without holding a worker thread per request.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
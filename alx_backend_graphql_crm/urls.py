@@ -1,9 +1,15 @@
 from django.contrib import admin
 from django.urls import path
-from graphene_django.views import GraphQLView
 from django.views.decorators.csrf import csrf_exempt
+from crm.metrics import metrics_view
+from crm.views import AsyncCRMGraphQLView, CRMGraphQLView, export_orders, graphql_cache_stats, graphql_trace_stats
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("graphql", csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    path("graphql", csrf_exempt(CRMGraphQLView.as_view(graphiql=True))),
+    path("graphql/async", csrf_exempt(AsyncCRMGraphQLView.as_view())),
+    path("graphql/cache-stats", graphql_cache_stats),
+    path("graphql/traces", graphql_trace_stats),
+    path("orders/export", export_orders),
+    path("metrics", metrics_view),
 ]
@@ -0,0 +1,38 @@
+"""Helpers that let one resolver serve both the sync and the async executor.
+
+Resolvers run inside the event loop under ``AsyncCRMGraphQLView`` and in a
+plain thread everywhere else (WSGI, ``schema.execute``, ``sync_to_async``
+workers). Code that touches the database checks ``in_event_loop()`` and
+returns an awaitable built on Django's async ORM when it is true.
+"""
+import asyncio
+import inspect
+
+
+def in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def maybe_then(value, fn):
+    """Apply ``fn`` to ``value``, awaiting it first if it is awaitable."""
+    if inspect.isawaitable(value):
+        async def then():
+            return fn(await value)
+
+        return then()
+    return fn(value)
+
+
+def evaluate(queryset):
+    """Return ``queryset`` as is for the sync executor, or an awaitable list of its rows."""
+    if not in_event_loop():
+        return queryset
+
+    async def rows():
+        return [obj async for obj in queryset]
+
+    return rows()
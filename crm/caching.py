@@ -0,0 +1,205 @@
+import functools
+import hashlib
+import inspect
+import json
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import QuerySet
+from graphene.relay import PageInfo
+from graphql import DirectiveLocation, GraphQLArgument, GraphQLDirective, GraphQLInt, print_ast
+from graphql.execution.values import get_directive_values
+
+from . import metrics
+
+# Query-side hint: ``products @cacheControl(maxAge: 30)`` overrides the field's
+# TTL for this request; ``maxAge: 0`` bypasses the cache.
+CacheControlDirective = GraphQLDirective(
+    name="cacheControl",
+    locations=[DirectiveLocation.FIELD],
+    args={"maxAge": GraphQLArgument(GraphQLInt)},
+    description="Override how long (in seconds) the result of this field may be cached.",
+)
+
+_MISSING = object()
+
+
+def get_cache():
+    return caches[getattr(settings, "GRAPHQL_RESULT_CACHE", "default")]
+
+
+class ResultCacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    def record(self, field, hit):
+        with self._lock:
+            self._counts[field]["hits" if hit else "misses"] += 1
+        metrics.CACHE_REQUESTS.inc(cache="result", field=field, result="hit" if hit else "miss")
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                field: {**counts, "hit_ratio": counts["hits"] / (counts["hits"] + counts["misses"])}
+                for field, counts in self._counts.items()
+            }
+
+
+result_cache_stats = ResultCacheStats()
+
+
+def _version_key(model):
+    return f"gql-version:{model._meta.label_lower}"
+
+
+def model_versions(models):
+    cache = get_cache()
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Seed from the clock so an evicted version never repeats an old one.
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _bump_version(model):
+    cache = get_cache()
+    key = _version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+class _BumpOnCommit:
+    def __init__(self, model):
+        self.model = model
+
+    def __call__(self):
+        _bump_version(self.model)
+
+
+def invalidate_model(model):
+    """Make every cached result that depends on ``model`` unreachable.
+
+    The version is bumped now, for reads later in this transaction, and
+    again when it commits: until then other connections still read the old
+    rows and may cache them under the first bump. One commit-time bump per
+    model per transaction, however many rows the transaction writes.
+    """
+    _bump_version(model)
+    connection = transaction.get_connection()
+    if connection.in_atomic_block and not any(
+        isinstance(func, _BumpOnCommit) and func.model is model for _, func, _ in connection.run_on_commit
+    ):
+        transaction.on_commit(_BumpOnCommit(model))
+
+
+def cache_ttl(info, default):
+    for node in info.field_nodes:
+        hint = get_directive_values(CacheControlDirective, node, info.variable_values)
+        if hint and hint.get("maxAge") is not None:
+            return hint["maxAge"]
+    return default
+
+
+def result_key(info, args, models):
+    fragments = "".join(print_ast(f) for f in info.fragments.values())
+    payload = json.dumps(
+        [
+            print_ast(info.operation),
+            fragments,
+            info.variable_values,
+            info.path.as_list(),
+            args,
+            model_versions(models),
+        ],
+        cls=DjangoJSONEncoder,
+        sort_keys=True,
+    )
+    return f"gql-result:{info.parent_type.name}.{info.field_name}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def _cached(resolve, ttl, models, freeze=None, thaw=None):
+    @functools.wraps(resolve)
+    def wrapper(root, info, **args):
+        timeout = cache_ttl(info, ttl)
+        if not timeout:
+            return resolve(root, info, **args)
+
+        field = f"{info.parent_type.name}.{info.field_name}"
+        cache = get_cache()
+        key = result_key(info, args, models)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            result_cache_stats.record(field, hit=True)
+            return thaw(value) if thaw else value
+
+        result_cache_stats.record(field, hit=False)
+
+        def store(value):
+            if isinstance(value, QuerySet):
+                value = list(value)
+            cache.set(key, freeze(value) if freeze else value, timeout)
+            return value
+
+        value = resolve(root, info, **args)
+        if inspect.isawaitable(value):
+            async def store_async():
+                return store(await value)
+
+            return store_async()
+        return store(value)
+
+    return wrapper
+
+
+def cached_resolver(ttl, models):
+    """Cache a list resolver's rows, with their prefetched relations, for ``ttl`` seconds.
+
+    The key covers the operation, variables, field path and arguments, plus the
+    current version of every model in ``models`` (bumped by ``crm.signals``).
+    """
+    def decorator(resolve):
+        return _cached(resolve, ttl, models)
+
+    return decorator
+
+
+def cached_connection_resolver(resolve, connection_type, ttl, models):
+    """Like ``cached_resolver`` for a relay connection: caches nodes, cursors and page info."""
+
+    def freeze(connection):
+        page_info = connection.page_info
+        return {
+            "edges": [(edge.node, edge.cursor) for edge in connection.edges],
+            "page_info": {
+                "start_cursor": page_info.start_cursor,
+                "end_cursor": page_info.end_cursor,
+                "has_previous_page": page_info.has_previous_page,
+                "has_next_page": page_info.has_next_page,
+            },
+            "length": getattr(connection, "length", None),
+        }
+
+    def thaw(value):
+        connection = connection_type(
+            edges=[connection_type.Edge(node=node, cursor=cursor) for node, cursor in value["edges"]],
+            page_info=PageInfo(**value["page_info"]),
+        )
+        connection.length = value["length"]
+        return connection
+
+    return _cached(resolve, ttl, models, freeze=freeze, thaw=thaw)
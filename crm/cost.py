@@ -0,0 +1,143 @@
+from django.conf import settings
+from graphene_django.settings import graphene_settings
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLList,
+    GraphQLObjectType,
+    OperationType,
+    ValidationRule,
+    get_named_type,
+    get_nullable_type,
+)
+from graphql.execution.values import get_argument_values
+
+# Static cost of resolving one instance of a field, keyed by "Type.field".
+# Anything not listed costs 1 if it returns an object and 0 if it is a scalar;
+# mutations default to MUTATION_COST since they write.
+FIELD_COSTS = {
+    "Mutation.bulkCreateCustomers": 50,
+    "Mutation.bulkCreateOrders": 50,
+    "Mutation.updateLowStockProducts": 50,
+}
+MUTATION_COST = 10
+
+# Connection wrappers do not count towards depth. ``edges`` costs nothing;
+# ``node`` is charged like a list item, so a connection costs
+# ``first * (1 + node selection)`` and its rows are never free.
+RELAY_WRAPPERS = ("edges", "node")
+
+
+def is_connection(graphql_type):
+    return isinstance(graphql_type, GraphQLObjectType) and {"edges", "pageInfo"} <= set(graphql_type.fields)
+
+
+class CostAnalysis:
+    """Static cost and depth of one operation.
+
+    The cost of a field is its static cost plus the cost of its selection,
+    multiplied by how many items it can return: ``first``/``last`` (or the
+    relay max limit) for connections, ``GRAPHQL_DEFAULT_LIST_SIZE`` for lists.
+    Each connection ``node`` costs 1, so every row a connection can return
+    is charged.
+    """
+
+    def __init__(self, schema, document, variables=None):
+        self.schema = schema
+        self.variables = variables or {}
+        self.fragments = {
+            d.name.value: d for d in document.definitions if isinstance(d, FragmentDefinitionNode)
+        }
+        self.connection_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT or 100
+        self.list_size = getattr(settings, "GRAPHQL_DEFAULT_LIST_SIZE", 100)
+
+    def operation(self, operation):
+        root = self.schema.get_root_type(operation.operation)
+        base = MUTATION_COST if operation.operation == OperationType.MUTATION else None
+        return self.selection_set(root, operation.selection_set, base_cost=base)
+
+    def selection_set(self, parent_type, selection_set, base_cost=None, visited=()):
+        cost, depth = 0, 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_cost, field_depth = self.field(parent_type, selection, base_cost, visited)
+            else:
+                fragment, seen = selection, visited
+                if isinstance(selection, FragmentSpreadNode):
+                    name = selection.name.value
+                    fragment = self.fragments.get(name)
+                    if fragment is None or name in visited:
+                        continue
+                    seen = visited + (name,)
+                condition = fragment.type_condition
+                fragment_type = self.schema.get_type(condition.name.value) if condition else parent_type
+                field_cost, field_depth = self.selection_set(
+                    fragment_type, fragment.selection_set, base_cost, seen
+                )
+            cost += field_cost
+            depth = max(depth, field_depth)
+        return cost, depth
+
+    def field(self, parent_type, node, base_cost, visited):
+        name = node.name.value
+        fields = getattr(parent_type, "fields", {})
+        if name.startswith("__") or name not in fields:
+            return 0, 0
+        field_def = fields[name]
+        return_type = field_def.type
+        named_type = get_named_type(return_type)
+
+        cost = FIELD_COSTS.get(f"{parent_type.name}.{name}")
+        if cost is None and base_cost is not None:
+            cost = base_cost
+        elif cost is None:
+            cost = int(node.selection_set is not None and name != "edges")
+
+        multiplier = 1
+        if is_connection(named_type):
+            try:
+                args = get_argument_values(field_def, node, self.variables)
+            except GraphQLError:
+                args = {}
+            multiplier = args.get("first") or args.get("last") or self.connection_limit
+        elif isinstance(get_nullable_type(return_type), GraphQLList) and not is_connection(parent_type):
+            multiplier = self.list_size
+
+        child_cost, child_depth = 0, 0
+        if node.selection_set is not None:
+            child_cost, child_depth = self.selection_set(named_type, node.selection_set, visited=visited)
+        depth = child_depth + int(node.selection_set is not None and name not in RELAY_WRAPPERS)
+        return cost + multiplier * child_cost, depth
+
+
+def query_cost_rule(operation, variables, report, max_cost=None, max_depth=None):
+    """Build a validation rule that rejects ``operation`` when it is too expensive.
+
+    Costs depend on variables (``first: $n``), so unlike the spec rules this one
+    is built per request. The computed cost is written into ``report``.
+    """
+    max_cost = max_cost or getattr(settings, "GRAPHQL_MAX_QUERY_COST", 10_000)
+    max_depth = max_depth or getattr(settings, "GRAPHQL_MAX_QUERY_DEPTH", 8)
+
+    class QueryCostRule(ValidationRule):
+        def enter_operation_definition(self, node, *args):
+            if node is not operation:
+                return
+            cost, depth = CostAnalysis(self.context.schema, self.context.document, variables).operation(node)
+            report.update(cost=cost, depth=depth, maxCost=max_cost, maxDepth=max_depth)
+            if depth > max_depth:
+                self.report_error(GraphQLError(
+                    f"Query depth {depth} exceeds the maximum of {max_depth}.",
+                    node,
+                    extensions={"code": "QUERY_TOO_DEEP", "cost": dict(report)},
+                ))
+            if cost > max_cost:
+                self.report_error(GraphQLError(
+                    f"Query cost {cost} exceeds the maximum of {max_cost}.",
+                    node,
+                    extensions={"code": "QUERY_TOO_EXPENSIVE", "cost": dict(report)},
+                ))
+
+    return QueryCostRule
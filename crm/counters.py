@@ -0,0 +1,82 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .aio import in_event_loop
+from .models import Counter, Customer, Order
+
+
+_pending = threading.local()
+
+
+def increment(name, delta=1):
+    """Add ``delta`` to a counter; call inside the transaction of the write it tracks."""
+    if not delta:
+        return
+    deltas = getattr(_pending, "deltas", None)
+    if deltas is not None:
+        deltas[name] += delta
+        return
+    updated = Counter.objects.filter(name=name).update(value=F("value") + delta)
+    if not updated:
+        counter, created = Counter.objects.get_or_create(name=name, defaults={"value": delta})
+        if not created:
+            Counter.objects.filter(name=name).update(value=F("value") + delta)
+
+
+@contextmanager
+def batched():
+    """Add up the ``increment()`` calls made in the block and apply each counter once, at the end.
+
+    Deletes run under this: they send ``post_delete`` once per row, cascades
+    included. The block gets its own transaction, so the counters still
+    change atomically with the rows.
+    """
+    if getattr(_pending, "deltas", None) is not None:
+        yield
+        return
+    with transaction.atomic():
+        _pending.deltas = defaultdict(Decimal)
+        try:
+            yield
+            deltas = _pending.deltas
+        finally:
+            _pending.deltas = None
+        for name, delta in deltas.items():
+            increment(name, delta)
+
+
+def read(name):
+    """Current value of a counter (an awaitable inside the event loop)."""
+    value = Counter.objects.filter(name=name).values_list("value", flat=True)
+    if in_event_loop():
+        async def aread():
+            return await value.afirst() or Decimal("0")
+
+        return aread()
+    return value.first() or Decimal("0")
+
+
+def actual_totals():
+    """Totals computed from scratch with full-table aggregates."""
+    return {
+        Counter.CUSTOMERS: Decimal(Customer.objects.count()),
+        Counter.ORDERS: Decimal(Order.objects.count()),
+        Counter.REVENUE: Order.objects.aggregate(total=Sum("total_amount"))["total"] or Decimal("0"),
+    }
+
+
+def rebuild():
+    """Overwrite every counter with its actual total. Returns ``{name: (stored, actual)}``."""
+    drift = {}
+    for name, actual in actual_totals().items():
+        counter, _ = Counter.objects.select_for_update().get_or_create(name=name)
+        drift[name] = (counter.value, actual)
+        if counter.value != actual:
+            counter.value = actual
+            counter.save(update_fields=["value"])
+    return drift
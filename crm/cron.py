@@ -1,6 +1,7 @@
 import datetime
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
+
+from crm.graphql_client import execute
+from crm.metrics import track_job
 
 
 def log_crm_heartbeat():
@@ -14,18 +15,8 @@ def log_crm_heartbeat():
 
     # Optional: Verify GraphQL hello field
     try:
-        from gql import gql, Client
-        from gql.transport.requests import RequestsHTTPTransport
-
-        transport = RequestsHTTPTransport(
-            url="http://localhost:8000/graphql",
-            verify=False,
-            retries=2,
-        )
-        client = Client(transport=transport, fetch_schema_from_transport=False)
-
-        query = gql(""" query { hello } """)
-        result = client.execute(query)
+        with track_job("crm_heartbeat"):
+            result = execute(""" query { hello } """)
         with open("/tmp/crm_heartbeat_log.txt", "a") as log:
             log.write(f"{timestamp} GraphQL hello response: {result.get('hello', 'N/A')}\n")
     except Exception as e:
@@ -37,14 +28,7 @@ def update_low_stock():
     """Execute GraphQL mutation to restock low-stock products and log updates."""
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    transport = RequestsHTTPTransport(
-        url="http://localhost:8000/graphql",
-        verify=False,
-        retries=3,
-    )
-    client = Client(transport=transport, fetch_schema_from_transport=True)
-
-    mutation = gql("""
+    mutation = """
         mutation {
             updateLowStockProducts {
                 updatedProducts {
@@ -55,12 +39,14 @@ def update_low_stock():
                 message
             }
         }
-    """)
+    """
 
     try:
-        result = client.execute(mutation)
-        updates = result["updateLowStockProducts"]["updatedProducts"]
-        message = result["updateLowStockProducts"]["message"]
+        with track_job("update_low_stock") as run:
+            result = execute(mutation)
+            updates = result["updateLowStockProducts"]["updatedProducts"]
+            message = result["updateLowStockProducts"]["message"]
+            run.rows = len(updates)
 
         with open("/tmp/low_stock_updates_log.txt", "a") as log:
             log.write(f"{timestamp} - {message}\n")
@@ -68,4 +54,4 @@ def update_low_stock():
                 log.write(f"   Product: {product['name']}, New Stock: {product['stock']}\n")
     except Exception as e:
         with open("/tmp/low_stock_updates_log.txt", "a") as log:
-            log.write(f"{timestamp} - ERROR: {e}\n")
\ No newline at end of file
+            log.write(f"{timestamp} - ERROR: {e}\n")
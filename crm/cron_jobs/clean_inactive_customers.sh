@@ -0,0 +1,11 @@
+#!/bin/bash
+
+# Navigate to the Django project root (adjust if needed)
+PROJECT_DIR="$(dirname "$(dirname "$(dirname "$(realpath "$0")")")")"
+cd "$PROJECT_DIR" || exit 1
+
+# Batched, throttled delete of customers with no activity for a year
+RESULT=$(python manage.py cleanup_inactive_customers --days 365 --batch-size 500 --sleep 0.5 2>&1)
+
+# Log result with timestamp
+echo "$(date '+%Y-%m-%d %H:%M:%S') - $RESULT" >> /tmp/customer_cleanup_log.txt
@@ -1,41 +1,18 @@
 #!/usr/bin/env python3
-import datetime
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
+import os
+import sys
 
-# GraphQL endpoint
-transport = RequestsHTTPTransport(
-    url="http://localhost:8000/graphql",
-    verify=False,
-    retries=3,
-)
+# Run against the project in-process instead of calling the web tier over HTTP.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "alx_backend_graphql_crm.settings")
 
-client = Client(transport=transport, fetch_schema_from_transport=True)
+import django
 
-# Calculate cutoff date (7 days ago)
-cutoff_date = (datetime.datetime.now() - datetime.timedelta(days=7)).strftime("%Y-%m-%d")
+django.setup()
 
-# GraphQL query
-query = gql("""
-    query GetRecentOrders($cutoff: Date!) {
-        orders(orderDate_Gte: $cutoff) {
-            id
-            customer {
-                email
-            }
-        }
-    }
-""")
+from crm.reminders import send_order_reminders
 
-# Execute query
-result = client.execute(query, variable_values={"cutoff": cutoff_date})
+# Only orders placed since the last run are read, in bounded chunks.
+orders, reminders = send_order_reminders()
 
-orders = result.get("orders", [])
-
-# Log to file
-with open("/tmp/order_reminders_log.txt", "a") as log:
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    for order in orders:
-        log.write(f"{timestamp} - Order ID: {order['id']}, Customer Email: {order['customer']['email']}\n")
-
-print("Order reminders processed!")
+print(f"Order reminders processed! ({orders} new orders, {reminders} customers reminded)")
@@ -0,0 +1,252 @@
+import base64
+import datetime
+import json
+
+import graphene
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from graphene.relay import PageInfo
+from graphene_django.filter import DjangoFilterConnectionField
+from graphql import GraphQLError
+
+from .aio import in_event_loop
+from .caching import cached_connection_resolver
+from .loaders import get_loaders
+from .optimizer import optimize
+
+
+class BatchedConnectionField(DjangoFilterConnectionField):
+    """DjangoFilterConnectionField that plays nicely with the request loaders.
+
+    * Once a page has been sliced, the relations of its nodes are queued on
+      the loaders so nested ``customer`` / ``products`` / ``orders`` fields
+      resolve with one query per relation instead of one per row.
+    * Resolvers may return a plain list (as loaders do); it is only turned
+      back into a queryset when filter arguments need to be applied.
+    * Querysets are shaped by the selection set (see ``crm.optimizer``).
+    * ``cache_ttl`` / ``cache_models`` cache resolved pages (see ``crm.caching``).
+    * Under the async executor the (sync) pagination runs in a worker thread.
+    """
+
+    def __init__(self, *args, cache_ttl=None, cache_models=(), **kwargs):
+        self.cache_ttl = cache_ttl
+        self.cache_models = cache_models
+        super().__init__(*args, **kwargs)
+
+    def wrap_resolve(self, parent_resolver):
+        sync_resolver = super().wrap_resolve(parent_resolver)
+
+        def resolver(root, info, **args):
+            if in_event_loop():
+                return sync_to_async(sync_resolver)(root, info, **args)
+            return sync_resolver(root, info, **args)
+
+        if not self.cache_ttl:
+            return resolver
+        return cached_connection_resolver(resolver, self.connection_type, self.cache_ttl, self.cache_models)
+
+    @classmethod
+    def resolve_queryset(cls, connection, iterable, info, args, filtering_args, filterset_class):
+        if isinstance(iterable, (list, tuple)):
+            filters = {name: args[name] for name in filtering_args if args.get(name) is not None}
+            if not filters:
+                return list(iterable)
+            # Filter the batched rows through the loaders: one query for every
+            # sibling list with these arguments, not one per parent row.
+            model = connection._meta.node._meta.model
+            qs = super().resolve_queryset(
+                connection, model._default_manager, info, args, filtering_args, filterset_class
+            )
+            key = (filterset_class, json.dumps(filters, sort_keys=True, default=str))
+            return get_loaders(info).filter(key, qs, iterable)
+        qs = super().resolve_queryset(
+            connection, iterable, info, args, filtering_args, filterset_class
+        )
+        return optimize(qs, info)
+
+    @classmethod
+    def connection_resolver(
+        cls,
+        resolver,
+        connection,
+        default_manager,
+        queryset_resolver,
+        max_limit,
+        enforce_first_or_last,
+        root,
+        info,
+        **args,
+    ):
+        result = super().connection_resolver(
+            resolver,
+            connection,
+            default_manager,
+            queryset_resolver,
+            max_limit,
+            enforce_first_or_last,
+            root,
+            info,
+            **args,
+        )
+        edges = getattr(result, "edges", None)
+        if edges:
+            model = connection._meta.node._meta.model
+            get_loaders(info).prepare(model, [edge.node for edge in edges])
+        return result
+
+
+class KeysetConnection(graphene.relay.Connection):
+    """Connection returned by ``KeysetConnectionField``.
+
+    Subclasses set ``sort_fields`` to the model fields clients may order by.
+    ``totalCount`` is a separate ``COUNT(*)`` that only runs when selected.
+    """
+
+    sort_fields = ("id",)
+
+    class Meta:
+        abstract = True
+
+    total_count = graphene.Int()
+
+    def resolve_total_count(self, info):
+        if in_event_loop():
+            return self.iterable.acount()
+        return self.iterable.count()
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder without its cut of datetimes to milliseconds.
+
+    A cursor has to hold the exact stored value, or rows sharing a
+    millisecond are skipped or repeated by the seek.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def keyset_cursor(sort_field, value, pk):
+    payload = json.dumps([sort_field, value, pk], cls=CursorEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def parse_keyset_cursor(cursor, sort_field):
+    try:
+        field, value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise GraphQLError(f"Invalid cursor: {cursor}")
+    if field != sort_field:
+        raise GraphQLError(f"Cursor was issued for orderBy {field!r}, not {sort_field!r}")
+    return value, pk
+
+
+class KeysetConnectionField(BatchedConnectionField):
+    """Seek-paginated alternative to the offset-based relay connection.
+
+    The cursor carries the sort key and the primary key of the edge, so every
+    page is a ``WHERE (key, id) > (cursor) ORDER BY key, id LIMIT n`` query
+    whose cost does not grow with the page number. Takes the type's
+    ``KeysetConnection`` subclass instead of the node type.
+    """
+
+    def __init__(self, type_, *args, **kwargs):
+        super().__init__(type_, *args, **kwargs)
+        # Offsets are exactly what keyset pagination avoids. ``order_by`` is
+        # set here because DjangoFilterConnectionField swallows that kwarg.
+        self._base_args.pop("offset", None)
+        self._base_args["order_by"] = graphene.Argument(graphene.String)
+
+    @property
+    def type(self):
+        return self._type
+
+    @classmethod
+    def connection_resolver(
+        cls,
+        resolver,
+        connection,
+        default_manager,
+        queryset_resolver,
+        max_limit,
+        enforce_first_or_last,
+        root,
+        info,
+        **args,
+    ):
+        first = args.get("first")
+        last = args.get("last")
+        if enforce_first_or_last:
+            assert first or last, (
+                "You must provide a `first` or `last` value to properly paginate the `{}` connection."
+            ).format(info.field_name)
+        if max_limit:
+            assert (first or 0) <= max_limit and (last or 0) <= max_limit, (
+                "Requesting more than {} records on the `{}` connection is not allowed."
+            ).format(max_limit, info.field_name)
+            if first is None and last is None:
+                first = max_limit
+
+        order_by = args.get("order_by") or "id"
+        sort_field = order_by.lstrip("-")
+        if sort_field not in connection.sort_fields:
+            raise GraphQLError(
+                f"Cannot order {info.field_name} by {sort_field!r}; "
+                f"expected one of {', '.join(connection.sort_fields)}"
+            )
+        descending = order_by.startswith("-")
+
+        iterable = resolver(root, info, **args)
+        if iterable is None:
+            iterable = default_manager
+        qs = queryset_resolver(connection, iterable, info, args)
+
+        page = qs
+        deferred, defer = qs.query.deferred_loading
+        if deferred and not defer:
+            # The cursor needs the sort key even when it was not selected.
+            page = page.only(*deferred, sort_field)
+        if args.get("after"):
+            page = page.filter(cls._seek(sort_field, *parse_keyset_cursor(args["after"], sort_field), descending))
+        if args.get("before"):
+            page = page.filter(cls._seek(sort_field, *parse_keyset_cursor(args["before"], sort_field), not descending))
+
+        # Paginating backwards walks the index in reverse and flips the rows.
+        backwards = last is not None and first is None
+        sign = "-" if descending != backwards else ""
+        page = page.order_by(f"{sign}{sort_field}", f"{sign}pk")
+        limit = last if backwards else first
+        nodes = list(page[: limit + 1])
+        has_more = len(nodes) > limit
+        nodes = nodes[:limit]
+        if backwards:
+            nodes.reverse()
+
+        edges = [
+            connection.Edge(
+                node=node,
+                cursor=keyset_cursor(sort_field, getattr(node, sort_field), node.pk),
+            )
+            for node in nodes
+        ]
+        page_info = PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=has_more if backwards else bool(args.get("after")),
+            has_next_page=bool(args.get("before")) if backwards else has_more,
+        )
+        result = connection(edges=edges, page_info=page_info)
+        result.iterable = qs
+        if nodes:
+            get_loaders(info).prepare(qs.model, nodes)
+        return result
+
+    @staticmethod
+    def _seek(sort_field, value, pk, descending):
+        op = "lt" if descending else "gt"
+        if sort_field == "id":
+            return Q(**{f"pk__{op}": pk})
+        return Q(**{f"{sort_field}__{op}": value}) | Q(**{sort_field: value, f"pk__{op}": pk})
@@ -1,7 +1,20 @@
 # crm/filters.py
+import datetime
+
 import django_filters
+from django.utils import timezone
+
 from .models import Customer, Product, Order
 
+
+class LocalDateFilter(django_filters.DateFilter):
+    """A date filter on a DateTimeField: the date means midnight in the current time zone."""
+
+    def filter(self, qs, value):
+        if value:
+            value = timezone.make_aware(datetime.datetime.combine(value, datetime.time.min))
+        return super().filter(qs, value)
+
 class CustomerFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(field_name="name", lookup_expr="icontains")
     email = django_filters.CharFilter(field_name="email", lookup_expr="icontains")
@@ -29,8 +42,8 @@ class ProductFilter(django_filters.FilterSet):
 class OrderFilter(django_filters.FilterSet):
     total_amount__gte = django_filters.NumberFilter(field_name="total_amount", lookup_expr="gte")
     total_amount__lte = django_filters.NumberFilter(field_name="total_amount", lookup_expr="lte")
-    order_date__gte = django_filters.DateFilter(field_name="order_date", lookup_expr="gte")
-    order_date__lte = django_filters.DateFilter(field_name="order_date", lookup_expr="lte")
+    order_date__gte = LocalDateFilter(field_name="order_date", lookup_expr="gte")
+    order_date__lte = LocalDateFilter(field_name="order_date", lookup_expr="lte")
     customer_name = django_filters.CharFilter(field_name="customer__name", lookup_expr="icontains")
     product_name = django_filters.CharFilter(field_name="products__name", lookup_expr="icontains")
     product_id = django_filters.NumberFilter(field_name="products__id", lookup_expr="exact")
@@ -0,0 +1,79 @@
+"""Run GraphQL operations from cron jobs and Celery tasks without an HTTP hop.
+
+Operations go through the same pipeline as ``/graphql`` (document cache,
+cost limits, middleware) but in this process, so a scheduled job needs
+neither the web tier nor a schema introspection round trip. Set
+``CRM_GRAPHQL_HTTP_FALLBACK = True`` to retry over HTTP at
+``CRM_GRAPHQL_URL`` when the in-process executor itself cannot run.
+"""
+import json
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.http import HttpRequest
+
+
+class GraphQLClientError(Exception):
+    """The operation ran but returned errors."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(str(e.get("message", e)) if isinstance(e, dict) else str(e) for e in errors))
+
+
+class CRMClient:
+    def __init__(self, url=None, http_fallback=None, timeout=30):
+        self.url = url or getattr(settings, "CRM_GRAPHQL_URL", "http://localhost:8000/graphql")
+        if http_fallback is None:
+            http_fallback = getattr(settings, "CRM_GRAPHQL_HTTP_FALLBACK", False)
+        self.http_fallback = http_fallback
+        self.timeout = timeout
+        self._view = None
+
+    @property
+    def view(self):
+        if self._view is None:
+            from .views import CRMGraphQLView
+
+            self._view = CRMGraphQLView()
+        return self._view
+
+    def execute(self, query, variables=None, operation_name=None):
+        """Return the ``data`` of the operation, raising ``GraphQLClientError`` on errors."""
+        try:
+            return self.execute_local(query, variables, operation_name)
+        except GraphQLClientError:
+            raise
+        except Exception:
+            if not self.http_fallback:
+                raise
+            return self.execute_http(query, variables, operation_name)
+
+    def execute_local(self, query, variables=None, operation_name=None):
+        # A POST so mutations are allowed; the request doubles as the context.
+        request = HttpRequest()
+        request.method = "POST"
+        request.path = request.path_info = "/graphql"
+        result = self.view.execute_graphql_request(request, {}, query, variables, operation_name)
+        if result.errors:
+            raise GraphQLClientError([self.view.format_error(e) for e in result.errors])
+        return result.data
+
+    def execute_http(self, query, variables=None, operation_name=None):
+        body = json.dumps({"query": query, "variables": variables, "operationName": operation_name}).encode()
+        request = urllib.request.Request(self.url, body, {"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.load(response)
+        except urllib.error.HTTPError as e:
+            # The view answers 400 with a GraphQL error body for invalid operations.
+            payload = json.load(e)
+        if payload.get("errors"):
+            raise GraphQLClientError(payload["errors"])
+        return payload.get("data")
+
+
+def execute(query, variables=None, operation_name=None):
+    """Shortcut for ``CRMClient().execute(...)`` with the settings defaults."""
+    return CRMClient().execute(query, variables, operation_name)
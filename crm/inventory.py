@@ -0,0 +1,55 @@
+from django.db import transaction
+from django.db.models import Case, F, Max, Min, When
+from django.db.models.functions import Coalesce
+
+from .caching import invalidate_model
+from .models import Product
+
+
+def reserve_stock(quantities):
+    """Take ``{product_id: quantity}`` out of stock with one conditional UPDATE.
+
+    ``UPDATE ... SET stock = stock - qty WHERE id IN (...) AND stock >= qty``
+    only touches the rows it decrements and cannot drive stock negative, so
+    concurrent orders never oversell. Returns False (and the caller must roll
+    back its transaction) when any product lacked stock.
+    """
+    if not quantities:
+        return True
+    wanted = Case(
+        *(When(pk=pk, then=qty) for pk, qty in quantities.items()),
+        default=0,
+    )
+    updated = (
+        Product.objects
+        .filter(pk__in=list(quantities), stock__gte=wanted)
+        .update(stock=F("stock") - wanted)
+    )
+    invalidate_model(Product)
+    return updated == len(quantities)
+
+
+def restock_low_stock(threshold=10, amount=10, batch_size=1000):
+    """Add ``amount`` to every product below its reorder point; return the ids restocked.
+
+    A product's ``reorder_point`` wins over ``threshold``. The catalog is walked
+    in primary-key ranges of ``batch_size`` so each ``UPDATE ... SET stock =
+    stock + amount`` holds the write lock briefly; the stock condition is part of
+    the UPDATE itself, so a concurrent order can never be overwritten.
+    """
+    low = Product.objects.filter(stock__lt=Coalesce("reorder_point", threshold))
+    bounds = Product.objects.aggregate(lo=Min("pk"), hi=Max("pk"))
+    if bounds["lo"] is None:
+        return []
+
+    restocked = []
+    for start in range(bounds["lo"], bounds["hi"] + 1, batch_size):
+        with transaction.atomic():
+            chunk = low.filter(pk__gte=start, pk__lt=start + batch_size)
+            ids = list(chunk.values_list("pk", flat=True))
+            if ids:
+                chunk.filter(pk__in=ids).update(stock=F("stock") + amount)
+                restocked += ids
+    if restocked:
+        invalidate_model(Product)
+    return restocked
@@ -0,0 +1,206 @@
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+
+from .aio import in_event_loop
+from .models import Customer, Order, OrderItem, Product
+
+
+class DataLoader:
+    """Request-scoped batching loader that needs no event loop to batch.
+
+    Keys are queued with ``prepare()`` (usually for a whole page of parent
+    rows) and the first ``load()`` that misses the cache fetches every queued
+    key with a single ``batch_load()`` call. Inside the event loop ``load()``
+    returns an awaitable and the batch runs in a ``sync_to_async`` thread.
+    """
+
+    default = None
+
+    def __init__(self, loaders):
+        self.loaders = loaders
+        self._cache = {}
+        self._queue = {}
+
+    def batch_load(self, keys):
+        raise NotImplementedError
+
+    def prime(self, key, value):
+        self._cache.setdefault(key, value)
+
+    def prepare(self, keys):
+        for key in keys:
+            if key is not None and key not in self._cache:
+                self._queue[key] = None
+
+    def load(self, key):
+        if key in self._cache:
+            return self._cache[key]
+        self.prepare([key])
+        if in_event_loop():
+            return self._aload(key)
+        self.dispatch()
+        return self._cache.get(key, self.default)
+
+    async def _aload(self, key):
+        # Every sibling queued before the first await goes out in this batch.
+        # sync_to_async runs dispatches one at a time, so a later caller finds
+        # the key cached unless it was queued after that batch had started.
+        await sync_to_async(self.dispatch)()
+        if key not in self._cache:
+            self.prepare([key])
+            await sync_to_async(self.dispatch)()
+        return self._cache.get(key, self.default)
+
+    def dispatch(self):
+        keys = list(self._queue)
+        self._queue.clear()
+        if not keys:
+            return
+        results = self.batch_load(keys)
+        for key in keys:
+            self._cache[key] = results.get(key, self.default)
+
+
+class CustomerLoader(DataLoader):
+    def batch_load(self, keys):
+        return Customer.objects.in_bulk(keys)
+
+
+class ProductLoader(DataLoader):
+    def batch_load(self, keys):
+        return Product.objects.in_bulk(keys)
+
+
+class ItemsByOrderLoader(DataLoader):
+    default = ()
+
+    def batch_load(self, keys):
+        results = defaultdict(list)
+        rows = (
+            OrderItem.objects
+            .filter(order_id__in=keys)
+            .select_related("product")
+            .order_by("pk")
+        )
+        for row in rows:
+            results[row.order_id].append(row)
+        # The same rows answer ``products`` for these orders.
+        for key in keys:
+            self.loaders.products_by_order.prime(key, [row.product for row in results.get(key, ())])
+        return results
+
+
+class ProductsByOrderLoader(DataLoader):
+    default = ()
+
+    def batch_load(self, keys):
+        # Go through the order lines so ``items`` and ``products`` share one query.
+        items = self.loaders.items_by_order
+        items.prepare(keys)
+        items.dispatch()
+        return {key: [row.product for row in items.load(key)] for key in keys}
+
+
+class OrdersByCustomerLoader(DataLoader):
+    default = ()
+
+    def batch_load(self, keys):
+        results = defaultdict(list)
+        for order in Order.objects.filter(customer_id__in=keys).order_by("pk"):
+            results[order.customer_id].append(order)
+        # Orders fetched here are the parents of the next level down.
+        self.loaders.prepare(Order, [o for orders in results.values() for o in orders])
+        return results
+
+
+class MatchLoader(DataLoader):
+    """Whether each primary key passes ``queryset`` (a filtered queryset)."""
+
+    default = False
+
+    def __init__(self, loaders, queryset):
+        super().__init__(loaders)
+        self.queryset = queryset
+
+    def batch_load(self, keys):
+        matched = set(self.queryset.filter(pk__in=keys).values_list("pk", flat=True))
+        return {key: key in matched for key in keys}
+
+
+class Loaders:
+    def __init__(self):
+        self.customer = CustomerLoader(self)
+        self.product = ProductLoader(self)
+        self.items_by_order = ItemsByOrderLoader(self)
+        self.products_by_order = ProductsByOrderLoader(self)
+        self.orders_by_customer = OrdersByCustomerLoader(self)
+        self._matches = {}
+        self._pages = []
+
+    def loaded(self, model):
+        """Every ``model`` row this request has fetched so far.
+
+        That is the relation loaders' caches plus whatever the optimizer
+        prefetched onto the pages passed to ``prepare()``, at any depth.
+        """
+        stack = list(self._pages)
+        for loader in (self.customer, self.product, self.products_by_order, self.orders_by_customer):
+            for value in loader._cache.values():
+                stack.extend(value if isinstance(value, (list, tuple)) else (value,))
+        seen = set()
+        while stack:
+            obj = stack.pop()
+            if obj is None or id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            if isinstance(obj, model):
+                yield obj
+            for related in getattr(obj, "_prefetched_objects_cache", {}).values():
+                stack.extend(related._result_cache or ())
+
+    def filter(self, key, queryset, instances):
+        """The ``instances`` that ``queryset`` matches.
+
+        ``key`` identifies the filter. Every row of the model loaded so far is
+        checked in the same query, so the sibling lists of a page (each
+        order's ``products(name: ...)``) cost one query between them.
+        """
+        loader = self._matches.get(key)
+        if loader is None:
+            loader = self._matches[key] = MatchLoader(self, queryset)
+        if any(obj.pk not in loader._cache for obj in instances):
+            loader.prepare(obj.pk for obj in self.loaded(queryset.model))
+            loader.prepare(obj.pk for obj in instances)
+            loader.dispatch()
+        return [obj for obj in instances if loader.load(obj.pk)]
+
+    def prepare(self, model, instances):
+        """Queue the relations of a page of ``model`` rows for batch loading."""
+        self._pages.extend(instances)
+        if model is Order:
+            # Pages loaded without customer_id (no customer selected) skip it:
+            # reading a deferred field costs a query per row.
+            self.customer.prepare(o.customer_id for o in instances if "customer_id" not in o.get_deferred_fields())
+            self.items_by_order.prepare(o.pk for o in instances)
+            self.products_by_order.prepare(o.pk for o in instances)
+        elif model is Customer:
+            for customer in instances:
+                self.customer.prime(customer.pk, customer)
+            self.orders_by_customer.prepare(c.pk for c in instances)
+        return instances
+
+
+def get_loaders(info):
+    """Return the loaders bound to the current request, creating them on first use."""
+    context = info.context
+    loaders = getattr(context, "crm_loaders", None)
+    if loaders is None:
+        loaders = Loaders()
+        try:
+            context.crm_loaders = loaders
+        except AttributeError:
+            # No mutable context (e.g. schema.execute() without context_value):
+            # fall back to a per-call loader, which still works, just unbatched.
+            pass
+    return loaders
@@ -0,0 +1,43 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from crm.models import Order
+from crm.rollups import rollup_days
+
+
+class Command(BaseCommand):
+    help = "Recompute DailySalesRollup rows for a range of days (default: since the first order)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=datetime.date.fromisoformat, help='First day (YYYY-MM-DD)')
+        parser.add_argument('--end', type=datetime.date.fromisoformat, help='Last day (YYYY-MM-DD), default today')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Days recomputed per transaction')
+
+    def handle(self, *args, **options):
+        end = options['end'] or timezone.localdate()
+        start = options['start']
+        if start is None:
+            first = Order.objects.aggregate(first=Min("order_date"))["first"]
+            if first is None:
+                self.stdout.write("No orders to roll up.")
+                return
+            start = timezone.localtime(first).date()
+        if start > end:
+            raise CommandError("--start is after --end")
+
+        step = datetime.timedelta(days=max(options['chunk_days'], 1))
+        began = time.perf_counter()
+        days = 0
+        chunk = start
+        while chunk <= end:
+            last = min(chunk + step - datetime.timedelta(days=1), end)
+            days += rollup_days(chunk, last)
+            chunk = last + datetime.timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled up {days} days ({start} to {end}) in {time.perf_counter() - began:.2f}s"
+        ))
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncRequestFactory, RequestFactory
+
+from crm.views import AsyncCRMGraphQLView, CRMGraphQLView
+
+
+QUERY = """
+    query {
+        hello
+        products(priceGte: 0) { name price }
+        orders { id totalAmount customer { name } }
+        allCustomers(first: 20) { edges { node { name email } } }
+    }
+"""
+
+
+class Command(BaseCommand):
+    help = "Compare concurrent request throughput of the sync and async GraphQL views."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per view')
+        parser.add_argument('--concurrency', type=int, default=16, help='In-flight requests (threads for the sync view)')
+        parser.add_argument('--query', default=QUERY, help='GraphQL document to send')
+
+    def handle(self, *args, **options):
+        total, concurrency = options['requests'], options['concurrency']
+        body = json.dumps({"query": options['query']})
+
+        sync_view = CRMGraphQLView.as_view()
+        async_view = AsyncCRMGraphQLView.as_view()
+        sync_factory, async_factory = RequestFactory(), AsyncRequestFactory()
+
+        def sync_call(_):
+            response = sync_view(sync_factory.post("/graphql", body, content_type="application/json"))
+            connection.close()
+            return response.status_code
+
+        async def async_calls():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def call():
+                async with semaphore:
+                    request = async_factory.post("/graphql/async", body, content_type="application/json")
+                    return (await async_view(request)).status_code
+
+            return await asyncio.gather(*(call() for _ in range(total)))
+
+        # Warm up caches (documents, results) so both views run the same path.
+        sync_call(None)
+        asyncio.run(async_view(async_factory.post("/graphql/async", body, content_type="application/json")))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            sync_codes = list(pool.map(sync_call, range(total)))
+        sync_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        async_codes = asyncio.run(async_calls())
+        async_elapsed = time.perf_counter() - start
+
+        self.stdout.write(f"{'view':<8}{'requests':>10}{'seconds':>10}{'req/s':>10}{'errors':>8}")
+        for name, codes, elapsed in (("sync", sync_codes, sync_elapsed), ("async", async_codes, async_elapsed)):
+            errors = sum(code != 200 for code in codes)
+            self.stdout.write(f"{name:<8}{total:>10}{elapsed:>10.2f}{total / elapsed:>10.1f}{errors:>8}")
@@ -0,0 +1,268 @@
+import json
+import math
+import statistics
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from crm.caching import invalidate_model
+from crm.graphql_client import CRMClient
+from crm.models import Customer, Order, Product
+from crm.sqlstats import QueryRecorder
+
+
+ALL_ORDERS = """
+    query ($first: Int) {
+        allOrders(first: $first) {
+            edges {
+                node {
+                    id
+                    orderDate
+                    totalAmount
+                    customer { name email }
+                    products { edges { node { name price } } }
+                }
+            }
+        }
+    }
+"""
+
+PRODUCTS_BY_PRICE = """
+    query ($gte: Float, $lte: Float) {
+        products(priceGte: $gte, priceLte: $lte) { id name price stock }
+    }
+"""
+
+BULK_CREATE_CUSTOMERS = """
+    mutation ($input: [CustomerInput]!) {
+        bulkCreateCustomers(input: $input) {
+            customers { id }
+            errors
+        }
+    }
+"""
+
+CREATE_ORDER = """
+    mutation ($input: OrderInput!) {
+        createOrder(input: $input) {
+            order { id totalAmount products { edges { node { name } } } }
+            errors
+        }
+    }
+"""
+
+UPDATE_LOW_STOCK = """
+    mutation {
+        updateLowStockProducts { count updatedProducts { name stock } }
+    }
+"""
+
+# Mutations run in a savepoint that is rolled back after every run, so each
+# run sees the same data.
+MUTATIONS = {"bulkCreateCustomers", "createOrder", "updateLowStockProducts"}
+
+# Fields compared against a baseline. Query and row counts are deterministic;
+# the median latency is only flagged beyond --threshold, and only means much
+# when both runs used the same machine (p95/p99 are in the JSON for diffing).
+LATENCY_KEYS = ("p50_ms",)
+COUNT_KEYS = ("queries", "rows")
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of ``values`` (sorted)."""
+    return values[max(math.ceil(q / 100 * len(values)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = "Time a catalog of GraphQL operations and count their SQL, optionally against a baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=2000, help='Customers the database must hold')
+        parser.add_argument('--products', type=int, default=500, help='Products the database must hold')
+        parser.add_argument('--orders', type=int, default=10_000, help='Orders the database must hold')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the rows added to reach those sizes')
+        parser.add_argument('--repeat', type=int, default=50, help='Measured runs per operation')
+        parser.add_argument('--warmup', type=int, default=3, help='Unmeasured runs per operation')
+        parser.add_argument('--operation', action='append', help='Only run this operation (repeatable)')
+        parser.add_argument('--warm-cache', action='store_true', help='Let cached resolvers serve repeat runs')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='JSON from an earlier run to compare against')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Latency increase flagged as a regression')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        self.client = CRMClient()
+        # Rolled back at the end, like the other bench_* commands.
+        with transaction.atomic():
+            sizes = self.ensure_data(options)
+            catalog = self.catalog()
+            names = options['operation'] or list(catalog)
+            unknown = set(names) - set(catalog)
+            if unknown:
+                raise CommandError(f"Unknown operation(s): {', '.join(sorted(unknown))}. Choose from {', '.join(catalog)}.")
+
+            results = {}
+            for name in names:
+                query, variables = catalog[name]
+                results[name] = self.measure(name, query, variables, options)
+            transaction.set_rollback(True)
+
+        report = {
+            "meta": {
+                "created": timezone.now().isoformat(),
+                "repeat": options['repeat'],
+                "cache": "warm" if options['warm_cache'] else "cold",
+                **sizes,
+            },
+            "operations": results,
+        }
+        self.print_results(results)
+        if options['output']:
+            with open(options['output'], "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+                f.write("\n")
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if baseline:
+            regressions = self.compare(report, baseline, options['threshold'])
+            if regressions:
+                raise CommandError(f"{regressions} regression(s) against {options['baseline']}")
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def ensure_data(self, options):
+        missing = {
+            "customers": max(options['customers'] - Customer.objects.count(), 0),
+            "products": max(options['products'] - Product.objects.count(), 0),
+            "orders": max(options['orders'] - Order.objects.count(), 0),
+        }
+        if any(missing.values()):
+            self.stdout.write(f"Seeding temporary rows: {missing}")
+            call_command(
+                "seed",
+                customers=missing["customers"],
+                products=missing["products"],
+                orders=missing["orders"],
+                seed=options['seed'],
+                stdout=self.stdout,
+            )
+        return {
+            "customers": Customer.objects.count(),
+            "products": Product.objects.count(),
+            "orders": Order.objects.count(),
+        }
+
+    def catalog(self):
+        """Operation name -> (document, variables), built from the rows now in the database."""
+        customer = Customer.objects.order_by("pk").first()
+        product_ids = list(Product.objects.order_by("pk").values_list("pk", flat=True)[:3])
+        if not customer or not product_ids:
+            raise CommandError("The benchmark needs at least one customer and one product.")
+        # Enough stock for every createOrder run; rolled back with the rest.
+        Product.objects.filter(pk__in=product_ids).update(stock=1_000_000)
+        invalidate_model(Product)
+
+        return {
+            "allOrders": (ALL_ORDERS, {"first": 50}),
+            "products": (PRODUCTS_BY_PRICE, {"gte": 100, "lte": 500}),
+            "bulkCreateCustomers": (BULK_CREATE_CUSTOMERS, {
+                "input": [{"name": f"Bench {i}", "email": f"bench{i}@bench.example"} for i in range(1000)],
+            }),
+            "createOrder": (CREATE_ORDER, {
+                "input": {"customerId": customer.pk, "items": [{"productId": pk, "quantity": 2} for pk in product_ids]},
+            }),
+            "updateLowStockProducts": (UPDATE_LOW_STOCK, None),
+        }
+
+    def run(self, name, query, variables, cold):
+        if cold:
+            # New model versions make every cached result unreachable, while
+            # parsed documents stay cached as they would in a warm worker.
+            for model in (Customer, Product, Order):
+                invalidate_model(model)
+        with QueryRecorder() as sql:
+            start = time.perf_counter()
+            if name in MUTATIONS:
+                with transaction.atomic():
+                    data = self.client.execute_local(query, variables)
+                    transaction.set_rollback(True)
+            else:
+                data = self.client.execute_local(query, variables)
+            elapsed = time.perf_counter() - start
+        # A mutation that reports errors took the wrong path; its timing is meaningless.
+        for payload in data.values():
+            if isinstance(payload, dict) and payload.get("errors"):
+                raise CommandError(f"{name} returned errors: {payload['errors']}")
+        return elapsed, sql
+
+    def measure(self, name, query, variables, options):
+        cold = not options['warm_cache']
+        for _ in range(options['warmup']):
+            self.run(name, query, variables, cold)
+
+        timings, queries, rows, db = [], 0, 0, []
+        for _ in range(max(options['repeat'], 1)):
+            elapsed, sql = self.run(name, query, variables, cold)
+            timings.append(elapsed * 1000)
+            db.append(sql.duration * 1000)
+            # Counts should not vary between runs; keep the worst if they do.
+            queries, rows = max(queries, sql.queries), max(rows, sql.rows)
+        timings.sort()
+        return {
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p95_ms": round(percentile(timings, 95), 3),
+            "p99_ms": round(percentile(timings, 99), 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "db_ms": round(statistics.median(db), 3),
+            "queries": queries,
+            "rows": rows,
+        }
+
+    def print_results(self, results):
+        self.stdout.write(
+            f"{'operation':<24}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'db (ms)':>10}{'queries':>9}{'rows':>8}"
+        )
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<24}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+                f"{r['db_ms']:>10.2f}{r['queries']:>9}{r['rows']:>8}"
+            )
+
+    def compare(self, report, baseline, threshold):
+        """Print every change against ``baseline`` and return how many are regressions."""
+        base_meta = baseline.get("meta", {})
+        for key in ("customers", "products", "orders", "cache"):
+            if key in base_meta and base_meta[key] != report["meta"][key]:
+                self.stdout.write(self.style.WARNING(
+                    f"Baseline {key} was {base_meta[key]}, this run has {report['meta'][key]}; latencies may not compare."
+                ))
+
+        regressions = 0
+        for name, current in report["operations"].items():
+            before = baseline.get("operations", {}).get(name)
+            if before is None:
+                self.stdout.write(f"{name}: not in the baseline")
+                continue
+            for key in COUNT_KEYS + LATENCY_KEYS:
+                old, new = before.get(key), current[key]
+                if old is None or old == new:
+                    continue
+                if key in COUNT_KEYS:
+                    worse = new > old
+                else:
+                    worse = old > 0 and (new - old) / old > threshold
+                change = f"{name}.{key}: {old} -> {new}"
+                if old:
+                    change += f" ({(new - old) / old:+.0%})"
+                if worse:
+                    regressions += 1
+                    self.stdout.write(self.style.ERROR(f"REGRESSION {change}"))
+                elif key in COUNT_KEYS or (old > 0 and (old - new) / old > threshold):
+                    self.stdout.write(self.style.SUCCESS(f"improved   {change}"))
+        return regressions
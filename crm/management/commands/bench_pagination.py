@@ -0,0 +1,77 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from crm.fields import keyset_cursor
+from crm.models import Customer, Order
+
+
+OFFSET_QUERY = """
+    query ($first: Int, $offset: Int) {
+        allOrders(first: $first, offset: $offset) {
+            edges { node { id orderDate totalAmount } }
+        }
+    }
+"""
+
+KEYSET_QUERY = """
+    query ($first: Int, $after: String) {
+        allOrdersKeyset(first: $first, after: $after, orderBy: "-order_date") {
+            edges { node { id orderDate totalAmount } }
+        }
+    }
+"""
+
+
+class Command(BaseCommand):
+    help = "Compare offset and keyset pagination of allOrders on page 1 and a deep page."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', type=int, default=10_000, help='Deep page number to compare against page 1')
+        parser.add_argument('--page-size', type=int, default=10, help='Orders per page')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per measurement (best is reported)')
+
+    def handle(self, *args, **options):
+        from alx_backend_graphql_crm.schema import schema
+
+        page, size, repeat = options['page'], options['page_size'], options['repeat']
+        needed = page * size
+
+        # Everything runs inside a transaction that is rolled back at the end,
+        # so the benchmark never leaves rows behind.
+        with transaction.atomic():
+            existing = Order.objects.count()
+            if existing < needed:
+                self.stdout.write(f"Inserting {needed - existing} temporary orders...")
+                customer = Customer.objects.create(name="Bench", email="bench-pagination@example.com")
+                Order.objects.bulk_create(
+                    (Order(customer=customer, total_amount=Decimal("1.00")) for _ in range(needed - existing)),
+                    batch_size=5000,
+                )
+
+            offset = (page - 1) * size
+            boundary = Order.objects.order_by("-order_date", "-pk")[offset - 1] if offset else None
+            after = keyset_cursor("order_date", boundary.order_date, boundary.pk) if boundary else None
+
+            def best(query, variables):
+                timings = []
+                for _ in range(repeat):
+                    request = RequestFactory().post("/graphql")
+                    start = time.perf_counter()
+                    result = schema.execute(query, variables=variables, context_value=request)
+                    timings.append(time.perf_counter() - start)
+                    assert not result.errors, result.errors
+                return min(timings) * 1000
+
+            rows = [
+                ("offset", best(OFFSET_QUERY, {"first": size}), best(OFFSET_QUERY, {"first": size, "offset": offset})),
+                ("keyset", best(KEYSET_QUERY, {"first": size}), best(KEYSET_QUERY, {"first": size, "after": after})),
+            ]
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'mode':<8}{'page 1 (ms)':>14}{f'page {page} (ms)':>20}")
+        for mode, first_page, deep_page in rows:
+            self.stdout.write(f"{mode:<8}{first_page:>14.2f}{deep_page:>20.2f}")
@@ -0,0 +1,62 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from crm.models import Customer
+from crm.search import search_ids
+
+
+class Command(BaseCommand):
+    help = "Compare FTS5 prefix search with the icontains filter on customers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=200_000, help='Customers to search over')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per term (median is reported)')
+        parser.add_argument('--limit', type=int, default=10, help='Results per lookup')
+
+    def handle(self, *args, **options):
+        needed, repeat, limit = options['customers'], options['repeat'], options['limit']
+        rng = random.Random(0)
+
+        def word(n):
+            return "".join(rng.choice(string.ascii_lowercase) for _ in range(n))
+
+        # Rolled back at the end, like bench_pagination.
+        with transaction.atomic():
+            existing = Customer.objects.count()
+            if existing < needed:
+                self.stdout.write(f"Inserting {needed - existing} temporary customers...")
+                Customer.objects.bulk_create(
+                    (
+                        Customer(name=f"{word(6).title()} {word(8).title()}", email=f"{word(10)}.{i}@bench.example")
+                        for i in range(needed - existing)
+                    ),
+                    batch_size=5000,
+                )
+            sample = Customer.objects.order_by("?").values_list("name", flat=True)[:5]
+            # Prefix of the last word; existing names need not have two words.
+            terms = [name.split()[-1][:3] for name in sample if name.split()] + ["zzzzq"]
+
+            def median(fn):
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    fn()
+                    timings.append(time.perf_counter() - start)
+                return sorted(timings)[len(timings) // 2] * 1000
+
+            rows = []
+            for term in terms:
+                icontains = median(lambda: list(
+                    Customer.objects.filter(name__icontains=term).values_list("pk", flat=True)[:limit]
+                ))
+                fts = median(lambda: search_ids(Customer, term, limit))
+                rows.append((term, icontains, fts))
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'term':<10}{'icontains (ms)':>16}{'fts5 (ms)':>12}")
+        for term, icontains, fts in rows:
+            self.stdout.write(f"{term:<10}{icontains:>16.2f}{fts:>12.2f}")
@@ -0,0 +1,147 @@
+import multiprocessing
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+
+from crm.inventory import restock_low_stock
+from crm.models import Order
+
+# Django's out-of-the-box SQLite against the profile in settings.
+PROFILES = {
+    "default": ({"journal_mode": "DELETE", "synchronous": "FULL"}, "DEFERRED"),
+    "production": (None, "IMMEDIATE"),
+}
+
+
+def read_page():
+    """What an allOrders page costs the database: a count and a page joined to customers."""
+    Order.objects.count()
+    list(Order.objects.select_related("customer").order_by("-order_date", "-pk")[:50])
+
+
+def write_batch():
+    """The low-stock cron mutation: reads product ids, then updates them, in short transactions."""
+    restock_low_stock(threshold=10**9, amount=1, batch_size=100)
+
+
+def worker(role, path, pragmas, transaction_mode, start_at, stop_at, results):
+    # Forked with no open connection; point this process at the copy and profile.
+    settings.SQLITE_PRAGMAS = pragmas
+    connection.settings_dict["NAME"] = path
+    connection.settings_dict["OPTIONS"] = {**connection.settings_dict["OPTIONS"], "transaction_mode": transaction_mode}
+    work = read_page if role == "read" else write_batch
+    timings, errors = [], 0
+    time.sleep(max(start_at - time.time(), 0))
+    while time.time() < stop_at:
+        start = time.perf_counter()
+        try:
+            work()
+        except OperationalError:
+            errors += 1
+            continue
+        timings.append(time.perf_counter() - start)
+    connection.close()
+    results.put((role, timings, errors))
+
+
+class Command(BaseCommand):
+    help = "Measure read throughput while writes run, under Django's default SQLite setup and the tuned profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+        parser.add_argument('--readers', type=int, default=4, help='Reading processes')
+        parser.add_argument('--writers', type=int, default=2, help='Writing processes')
+        parser.add_argument('--orders', type=int, default=20_000, help='Orders in the copy the benchmark runs on')
+        parser.add_argument('--profile', action='append', choices=list(PROFILES), help='Only run this profile (repeatable)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("bench_sqlite only applies to SQLite.")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.sqlite3")
+            # Work on a copy; the benchmark writes and changes the journal mode.
+            with connection.cursor() as cursor:
+                cursor.execute("VACUUM INTO %s", [path])
+            original = connection.settings_dict["NAME"]
+            connections.close_all()
+            connection.settings_dict["NAME"] = path
+            try:
+                missing = options['orders'] - Order.objects.count()
+                if missing > 0:
+                    self.stdout.write(f"Seeding {missing} orders into the copy...")
+                    call_command(
+                        "seed", customers=max(missing // 5, 1), products=500, orders=missing, seed=0, stdout=self.stdout,
+                    )
+                connections.close_all()
+
+                rows = []
+                for name in options['profile'] or list(PROFILES):
+                    pragmas, transaction_mode = PROFILES[name]
+                    if pragmas is None:
+                        pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+                    rows.append((name, self.run(path, pragmas, transaction_mode, options)))
+            finally:
+                connections.close_all()
+                connection.settings_dict["NAME"] = original
+
+        self.stdout.write(
+            f"{'profile':<12}{'reads/s':>9}{'read p50':>10}{'read p99':>10}{'writes/s':>10}{'write p50':>11}"
+            f"{'locked':>8}"
+        )
+        for name, r in rows:
+            self.stdout.write(
+                f"{name:<12}{r['reads_per_s']:>9.0f}{r['read_p50_ms']:>8.1f}ms{r['read_p99_ms']:>8.1f}ms"
+                f"{r['writes_per_s']:>10.1f}{r['write_p50_ms']:>9.1f}ms{r['locked']:>8}"
+            )
+
+    def run(self, path, pragmas, transaction_mode, options):
+        # The journal mode is a property of the file; switch it once, before
+        # any worker connects, rather than from every worker.
+        pragmas = dict(pragmas)
+        with closing(sqlite3.connect(path)) as db:
+            db.execute(f"PRAGMA journal_mode = {pragmas.pop('journal_mode', 'DELETE')}")
+
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        start_at = time.time() + 0.5
+        stop_at = start_at + options['seconds']
+        roles = ["read"] * options['readers'] + ["write"] * options['writers']
+        processes = [
+            context.Process(target=worker, args=(role, path, pragmas, transaction_mode, start_at, stop_at, results))
+            for role in roles
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        timings = {"read": [], "write": []}
+        locked = 0
+        for role, role_timings, errors in collected:
+            timings[role] += role_timings
+            locked += errors
+
+        def percentile(values, q):
+            if not values:
+                return 0.0
+            values = sorted(values)
+            return values[min(int(q / 100 * len(values)), len(values) - 1)] * 1000
+
+        return {
+            "reads_per_s": len(timings["read"]) / options['seconds'],
+            "read_p50_ms": percentile(timings["read"], 50),
+            "read_p99_ms": percentile(timings["read"], 99),
+            "writes_per_s": len(timings["write"]) / options['seconds'],
+            "write_p50_ms": statistics.median(timings["write"]) * 1000 if timings["write"] else 0.0,
+            "locked": locked,
+        }
@@ -0,0 +1,50 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from crm.models import Customer, Order
+
+
+class Command(BaseCommand):
+    help = "Delete customers with no activity for --days, in small primary-key batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help='Inactivity period before a customer is removed')
+        parser.add_argument('--batch-size', type=int, default=500, help='Customers deleted per transaction')
+        parser.add_argument('--sleep', type=float, default=0.5, help='Seconds to pause between batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        batch_size = max(options['batch_size'], 1)
+        # Uses the last_activity_at index; never a full scan of customers.
+        inactive = Customer.objects.filter(last_activity_at__lt=cutoff)
+
+        if options['dry_run']:
+            customers = inactive.count()
+            orders = Order.objects.filter(customer__in=inactive).count()
+            self.stdout.write(f"Would delete {customers} customers and {orders} orders inactive since {cutoff:%Y-%m-%d}.")
+            return
+
+        deleted = batches = 0
+        last_pk = 0
+        while True:
+            pks = list(
+                inactive.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            last_pk = pks[-1]
+            # One short transaction per batch; the activity check is repeated so
+            # a customer who ordered since the batch was read is kept.
+            with transaction.atomic():
+                _, per_model = inactive.filter(pk__in=pks).delete()
+            deleted += per_model.get(Customer._meta.label, 0)
+            batches += 1
+            if len(pks) == batch_size and options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted customers: {deleted} in {batches} batches"))
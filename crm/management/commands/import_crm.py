@@ -0,0 +1,150 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from crm import counters
+from crm.caching import invalidate_model
+from crm.models import Counter, Customer, Product
+from crm.validators import customer_errors, product_errors
+
+
+def read_lines(path, offset=0, skip_header=False):
+    """Yield ``(end_offset, line)`` for each line of ``path`` from byte ``offset`` on.
+
+    Files are read in binary mode so the offsets are exact byte positions that
+    ``--*-offset`` can resume from; only one line is held in memory at a time.
+    """
+    with open(path, "rb") as f:
+        header = f.readline() if skip_header else None
+        if header is not None:
+            yield f.tell(), header.decode("utf-8-sig")
+        if offset:
+            f.seek(offset)
+        while True:
+            line = f.readline()
+            if not line:
+                return
+            if line.strip():
+                # utf-8-sig only differs from utf-8 by dropping a leading BOM.
+                yield f.tell(), line.decode("utf-8-sig")
+
+
+def product_rows(path, offset=0):
+    """Yield ``(end_offset, Product or None, errors)`` for a CSV with a name,price,stock[,reorder_point] header."""
+    lines = read_lines(path, offset, skip_header=True)
+    _, header = next(lines, (0, ""))
+    columns = next(csv.reader([header]), [])
+    missing = {"name", "price"} - set(columns)
+    if missing:
+        raise CommandError(f"{path}: missing column(s) {', '.join(sorted(missing))}")
+    for end, line in lines:
+        row = dict(zip(columns, next(csv.reader([line]))))
+        try:
+            stock = int(row.get("stock") or 0)
+            reorder_point = int(row["reorder_point"]) if row.get("reorder_point") else None
+        except ValueError:
+            yield end, None, [f"Invalid integer in row: {line.strip()}"]
+            continue
+        price, errors = product_errors(row.get("price"), stock)
+        if not row.get("name"):
+            errors.append("Name is required.")
+        if errors:
+            yield end, None, errors
+            continue
+        yield end, Product(name=row["name"], price=price, stock=stock, reorder_point=reorder_point), []
+
+
+def customer_rows(path, offset=0):
+    """Yield ``(end_offset, Customer or None, errors)`` for one JSON object per line."""
+    for end, line in read_lines(path, offset):
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield end, None, [f"Invalid JSON: {e}"]
+            continue
+        if not data.get("name") or not data.get("email"):
+            yield end, None, ["name and email are required."]
+            continue
+        errors = customer_errors(data.get("phone"))
+        if errors:
+            yield end, None, errors
+            continue
+        yield end, Customer(name=data["name"], email=data["email"], phone=data.get("phone")), []
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = "Upsert products from CSV and customers from NDJSON in streamed batches."
+
+    # model, unique key, columns overwritten on conflict, row reader
+    TARGETS = {
+        "products": (Product, "name", ["price", "stock", "reorder_point"], product_rows),
+        "customers": (Customer, "email", ["name", "phone"], customer_rows),
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', help='CSV file with name,price,stock[,reorder_point] columns')
+        parser.add_argument('--customers', help='NDJSON file with one {"name", "email", "phone"} object per line')
+        parser.add_argument('--products-offset', type=int, default=0, help='Byte offset to resume the products file from')
+        parser.add_argument('--customers-offset', type=int, default=0, help='Byte offset to resume the customers file from')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per upsert')
+
+    def handle(self, *args, **options):
+        if not options['products'] and not options['customers']:
+            raise CommandError("Pass --products and/or --customers.")
+        for target in ("products", "customers"):
+            if options[target]:
+                self.import_file(target, options[target], options[f'{target}_offset'], max(options['batch_size'], 1))
+
+    def import_file(self, target, path, offset, batch_size):
+        model, key, update_fields, reader = self.TARGETS[target]
+        created = updated = rejected = 0
+        start = time.perf_counter()
+
+        for batch in batched(reader(path, offset), batch_size):
+            objs = {}
+            for end, obj, errors in batch:
+                if errors:
+                    rejected += 1
+                    self.stderr.write(f"{path} (before byte {end}): {'; '.join(errors)}")
+                else:
+                    # The last occurrence of a key within a batch wins.
+                    objs[getattr(obj, key)] = obj
+
+            with transaction.atomic():
+                existing = model.objects.filter(**{f"{key}__in": list(objs)}).count()
+                model.objects.bulk_create(
+                    objs.values(),
+                    update_conflicts=True,
+                    unique_fields=[key],
+                    update_fields=update_fields,
+                )
+                if model is Customer:
+                    counters.increment(Counter.CUSTOMERS, len(objs) - existing)
+            # bulk_create sends no signals.
+            invalidate_model(model)
+            created += len(objs) - existing
+            updated += existing
+
+            elapsed = time.perf_counter() - start
+            rows = created + updated + rejected
+            self.stdout.write(
+                f"{target}: {rows} rows, {rows / elapsed:.0f} rows/s, "
+                f"committed through byte {batch[-1][0]} (resume with --{target}-offset {batch[-1][0]})"
+            )
+
+        elapsed = time.perf_counter() - start
+        rows = created + updated + rejected
+        self.stdout.write(self.style.SUCCESS(
+            f"{target}: {created} created, {updated} updated, {rejected} rejected "
+            f"in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
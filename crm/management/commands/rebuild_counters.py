@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from crm import counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the customer/order/revenue counters from scratch and report any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report drift, do not fix it')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = counters.rebuild()
+            if options['check']:
+                transaction.set_rollback(True)
+
+        for name, (stored, actual) in drift.items():
+            if stored == actual:
+                self.stdout.write(f"{name}: {actual} (ok)")
+            else:
+                verb = "would fix" if options['check'] else "fixed"
+                self.stdout.write(self.style.WARNING(f"{name}: stored {stored}, actual {actual} ({verb})"))
@@ -0,0 +1,330 @@
+"""Prometheus metrics that add up across worker processes.
+
+Each process writes its samples to its own memory-mapped file in
+``CRM_METRICS_DIR``, updating values in place, so recording a sample costs
+an uncontended thread lock and a couple of ``struct`` writes, never a
+syscall or a lock shared with other processes. ``/metrics`` reads every
+file in the directory and merges them: counters and histograms are summed,
+gauges take the largest value. Empty the directory when the service is
+restarted, as with ``prometheus_client``'s multiprocess mode.
+"""
+import bisect
+import functools
+import glob
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import HttpResponse
+
+_HEADER = struct.Struct("i4x")
+_LENGTH = struct.Struct("i")
+_VALUE = struct.Struct("d")
+_INITIAL_SIZE = 1 << 16
+
+
+def metrics_dir():
+    return getattr(settings, "CRM_METRICS_DIR", None) or os.path.join(tempfile.gettempdir(), "crm-metrics")
+
+
+class ValuesFile:
+    """Key -> float store in a memory-mapped file owned by one process.
+
+    Layout: a header with the number of bytes used, then entries of
+    ``[key length][key, padded to 8 bytes][float64 value]``. Entries are only
+    appended and the header is written last, so a reader never sees a
+    partial entry.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._positions = {}
+        self._file = open(path, "a+b")
+        if os.fstat(self._file.fileno()).st_size < _INITIAL_SIZE:
+            self._file.truncate(_INITIAL_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._used = _HEADER.unpack_from(self._map, 0)[0] or _HEADER.size
+        for key, value, offset in read_entries(self._map, self._used):
+            self._positions[key] = offset
+
+    def _add_key(self, key):
+        encoded = key.encode()
+        padded = len(encoded) + (8 - (len(encoded) + _LENGTH.size) % 8)
+        entry_size = _LENGTH.size + padded + _VALUE.size
+        while self._used + entry_size > len(self._map):
+            size = len(self._map) * 2
+            self._map.close()
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        start = self._used
+        _LENGTH.pack_into(self._map, start, len(encoded))
+        self._map[start + _LENGTH.size:start + _LENGTH.size + len(encoded)] = encoded
+        offset = start + _LENGTH.size + padded
+        _VALUE.pack_into(self._map, offset, 0.0)
+        self._used += entry_size
+        _HEADER.pack_into(self._map, 0, self._used)
+        self._positions[key] = offset
+        return offset
+
+    def add(self, items):
+        """Add each ``(key, amount)`` in ``items`` under one lock acquisition."""
+        with self._lock:
+            for key, amount in items:
+                offset = self._positions.get(key) or self._add_key(key)
+                _VALUE.pack_into(self._map, offset, _VALUE.unpack_from(self._map, offset)[0] + amount)
+
+    def set_max(self, key, value):
+        with self._lock:
+            offset = self._positions.get(key) or self._add_key(key)
+            if value > _VALUE.unpack_from(self._map, offset)[0]:
+                _VALUE.pack_into(self._map, offset, value)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def read_entries(buffer, used):
+    position = _HEADER.size
+    while position < used:
+        length = _LENGTH.unpack_from(buffer, position)[0]
+        key = bytes(buffer[position + _LENGTH.size:position + _LENGTH.size + length]).decode()
+        offset = position + _LENGTH.size + length + (8 - (length + _LENGTH.size) % 8)
+        yield key, _VALUE.unpack_from(buffer, offset)[0], offset
+        position = offset + _VALUE.size
+
+
+_local = {"file": None, "pid": None, "dir": None}
+_open_lock = threading.Lock()
+
+
+def values_file():
+    """This process's file, reopened after a fork or a change of ``CRM_METRICS_DIR``."""
+    directory, pid = metrics_dir(), os.getpid()
+    current = _local["file"]
+    if current is not None and _local["pid"] == pid and _local["dir"] == directory:
+        return current
+    with _open_lock:
+        if _local["file"] is None or _local["pid"] != pid or _local["dir"] != directory:
+            os.makedirs(directory, exist_ok=True)
+            _local.update(file=ValuesFile(os.path.join(directory, f"{pid}.db")), pid=pid, dir=directory)
+        return _local["file"]
+
+
+@functools.lru_cache(maxsize=4096)
+def _key(name, labels, le=None):
+    return json.dumps([name, labels, le])
+
+
+class Metric:
+    kind = None
+    registry = {}
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        Metric.registry[name] = self
+
+    def _labels(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        values_file().add([(_key(self.name, self._labels(labels)), amount)])
+
+
+class Gauge(Metric):
+    """A gauge merged across processes by taking the largest value (e.g. timestamps)."""
+
+    kind = "gauge"
+
+    def set_max(self, value, **labels):
+        values_file().set_max(_key(self.name, self._labels(labels)), value)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def items(self, values, **labels):
+        """The ``(key, amount)`` updates for observing every value in ``values``."""
+        names = self._labels(labels)
+        counts = {}
+        for value in values:
+            index = bisect.bisect_left(self.buckets, value)
+            counts[index] = counts.get(index, 0) + 1
+        bounds = self.buckets + (float("inf"),)
+        items = [(_key(self.name, names, bounds[index]), n) for index, n in counts.items()]
+        items.append((_key(self.name + "_sum", names), sum(values)))
+        items.append((_key(self.name + "_count", names), len(values)))
+        return items
+
+    def observe(self, value, **labels):
+        values_file().add(self.items([value], **labels))
+
+
+# -------------------- GraphQL --------------------
+OPERATIONS = Counter("crm_graphql_operations_total", "GraphQL operations executed.", ("operation", "type", "status"))
+OPERATION_SECONDS = Histogram(
+    "crm_graphql_operation_duration_seconds", "Time to execute a GraphQL operation.", ("operation", "type"),
+)
+RESOLVER_SECONDS = Histogram(
+    "crm_graphql_resolver_duration_seconds", "Time spent in each call of a resolver (crm.tracing).", ("field",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1),
+)
+DB_SECONDS = Histogram(
+    "crm_graphql_db_duration_seconds", "Database time of a GraphQL operation (crm.tracing).", ("operation",),
+)
+DB_QUERIES = Counter("crm_graphql_db_queries_total", "SQL queries run by GraphQL operations (crm.tracing).", ("operation",))
+N_PLUS_ONE = Counter("crm_graphql_n_plus_one_total", "Operations in which crm.tracing found an N+1.", ("field",))
+
+# -------------------- Caches --------------------
+CACHE_REQUESTS = Counter(
+    "crm_cache_requests_total", "Lookups in the document, persisted query and result caches.", ("cache", "field", "result"),
+)
+
+# -------------------- Jobs --------------------
+JOB_RUNS = Counter("crm_job_runs_total", "Scheduled job runs.", ("job", "status"))
+JOB_SECONDS = Histogram(
+    "crm_job_duration_seconds", "Duration of scheduled job runs.", ("job",),
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600),
+)
+JOB_ROWS = Counter("crm_job_rows_total", "Rows processed by scheduled jobs.", ("job",))
+JOB_LAST_SUCCESS = Gauge("crm_job_last_success_timestamp_seconds", "When the job last finished without error.", ("job",))
+
+_OPERATION_NAME = re.compile(r"[_A-Za-z][_0-9A-Za-z]{0,63}")
+_operation_names = set()
+MAX_OPERATION_NAMES = 200
+
+
+def operation_label(name):
+    """Bound the label values clients can create with operation names."""
+    if not name:
+        return "anonymous"
+    if name in _operation_names:
+        return name
+    if not _OPERATION_NAME.fullmatch(name) or len(_operation_names) >= MAX_OPERATION_NAMES:
+        return "other"
+    _operation_names.add(name)
+    return name
+
+
+def record_operation(name, kind, ok, seconds):
+    values_file().add([
+        (_key(OPERATIONS.name, (name, kind, "ok" if ok else "error")), 1),
+        *OPERATION_SECONDS.items([seconds], operation=name, type=kind),
+    ])
+
+
+def record_trace(operation, resolver_times, db_seconds, queries, n_plus_one_fields):
+    """Flush one request's resolver timings and SQL totals in a single write."""
+    items = []
+    for field, durations in resolver_times.items():
+        items += RESOLVER_SECONDS.items(durations, field=field)
+    items += DB_SECONDS.items([db_seconds], operation=operation)
+    items.append((_key(DB_QUERIES.name, (operation,)), queries))
+    for field in n_plus_one_fields:
+        items.append((_key(N_PLUS_ONE.name, (field,)), 1))
+    values_file().add(items)
+
+
+class JobRun:
+    rows = 0
+
+
+@contextmanager
+def track_job(job):
+    """``with track_job("name") as run: ...; run.rows = n`` records duration, rows and outcome."""
+    run = JobRun()
+    start = time.perf_counter()
+    try:
+        yield run
+    except BaseException:
+        JOB_RUNS.inc(job=job, status="error")
+        JOB_SECONDS.observe(time.perf_counter() - start, job=job)
+        raise
+    JOB_RUNS.inc(job=job, status="ok")
+    JOB_SECONDS.observe(time.perf_counter() - start, job=job)
+    JOB_ROWS.inc(run.rows, job=job)
+    JOB_LAST_SUCCESS.set_max(time.time(), job=job)
+
+
+# -------------------- Exposition --------------------
+def collect():
+    """Merge every process file: ``{(name, labels tuple, le): value}``."""
+    merged = {}
+    for path in glob.glob(os.path.join(metrics_dir(), "*.db")):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        if len(data) < _HEADER.size:
+            continue
+        used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+        for key, value, _ in read_entries(data, used):
+            name, labels, le = json.loads(key)
+            sample = (name, tuple(labels), le)
+            metric = Metric.registry.get(name)
+            if metric is not None and metric.kind == "gauge":
+                merged[sample] = max(merged.get(sample, value), value)
+            else:
+                merged[sample] = merged.get(sample, 0.0) + value
+    return merged
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, le=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(labelnames, values) if v != ""]
+    if le is not None:
+        pairs.append(f'le="{"+Inf" if le == float("inf") else repr(float(le))}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render():
+    merged = collect()
+    lines = []
+    for metric in Metric.registry.values():
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if metric.kind != "histogram":
+            for (name, labels, _), value in sorted(merged.items(), key=lambda item: item[0][1]):
+                if name == metric.name:
+                    lines.append(f"{name}{_format_labels(metric.labelnames, labels)} {_number(value)}")
+            continue
+        series = sorted({labels for (name, labels, _) in merged if name == metric.name + "_count"})
+        for labels in series:
+            cumulative = 0
+            for le in metric.buckets + (float("inf"),):
+                cumulative += merged.get((metric.name, labels, le), 0)
+                lines.append(f"{metric.name}_bucket{_format_labels(metric.labelnames, labels, le)} {_number(cumulative)}")
+            for suffix in ("_sum", "_count"):
+                value = merged.get((metric.name + suffix, labels, None), 0)
+                lines.append(f"{metric.name}{suffix}{_format_labels(metric.labelnames, labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    return HttpResponse(render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:23
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def seed_counters(apps, schema_editor):
+    Counter = apps.get_model('crm', 'Counter')
+    Customer = apps.get_model('crm', 'Customer')
+    Order = apps.get_model('crm', 'Order')
+    Counter.objects.bulk_create([
+        Counter(name='customers', value=Customer.objects.count()),
+        Counter(name='orders', value=Order.objects.count()),
+        Counter(name='revenue', value=Order.objects.aggregate(total=Sum('total_amount'))['total'] or 0),
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0002_counter'),
+    ]
+
+    operations = [
+        # Adopt the auto-created crm_order_products table as an explicit model;
+        # only the migration state changes, the table and its rows stay put.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='OrderItem',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='crm.order')),
+                        ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_items', to='crm.product')),
+                    ],
+                    options={
+                        'db_table': 'crm_order_products',
+                        'unique_together': {('order', 'product')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='order',
+                    name='products',
+                    field=models.ManyToManyField(related_name='orders', through='crm.OrderItem', to='crm.product'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='quantity',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0003_orderitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='reorder_point',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:35
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicates(apps, schema_editor):
+    # Keep the oldest product's name and suffix the others with their id,
+    # so the unique constraint can be added without losing any rows.
+    Product = apps.get_model('crm', 'Product')
+    duplicated = (
+        Product.objects.values('name').annotate(n=Count('id')).filter(n__gt=1).values_list('name', flat=True)
+    )
+    for name in list(duplicated):
+        for product in Product.objects.filter(name=name).order_by('id')[1:]:
+            product.name = f"{name} (#{product.pk})"[:255]
+            product.save(update_fields=['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0004_product_reorder_point'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='product',
+            name='name',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:41
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+# crm_customer's search triggers as 0006 created them, frozen here so later
+# changes to the search index cannot rewrite this migration.
+CUSTOMER_SEARCH_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS crm_customer_fts_ai",
+    "DROP TRIGGER IF EXISTS crm_customer_fts_ad",
+    "DROP TRIGGER IF EXISTS crm_customer_fts_au",
+    "CREATE TRIGGER crm_customer_fts_ai AFTER INSERT ON crm_customer BEGIN "
+    "INSERT INTO crm_customer_fts(rowid, name, email, phone) VALUES (new.id, new.name, new.email, new.phone); END",
+    "CREATE TRIGGER crm_customer_fts_ad AFTER DELETE ON crm_customer BEGIN "
+    "INSERT INTO crm_customer_fts(crm_customer_fts, rowid, name, email, phone) "
+    "VALUES ('delete', old.id, old.name, old.email, old.phone); END",
+    "CREATE TRIGGER crm_customer_fts_au AFTER UPDATE OF name, email, phone ON crm_customer BEGIN "
+    "INSERT INTO crm_customer_fts(crm_customer_fts, rowid, name, email, phone) "
+    "VALUES ('delete', old.id, old.name, old.email, old.phone); "
+    "INSERT INTO crm_customer_fts(rowid, name, email, phone) VALUES (new.id, new.name, new.email, new.phone); END",
+    "INSERT INTO crm_customer_fts(crm_customer_fts) VALUES ('rebuild')",
+]
+
+
+def backfill_from_orders(apps, schema_editor):
+    # Customers with orders were last active at their latest order; the rest
+    # keep the migration time, so nobody looks a year stale on day one.
+    Customer = apps.get_model('crm', 'Customer')
+    Order = apps.get_model('crm', 'Order')
+    latest = (
+        Order.objects.filter(customer=OuterRef('pk'))
+        .values('customer')
+        .annotate(latest=Max('order_date'))
+        .values('latest')
+    )
+    Customer.objects.filter(orders__isnull=False).distinct().update(last_activity_at=Subquery(latest))
+
+
+def reinstall_search_triggers(apps, schema_editor):
+    # Adding or removing a column rebuilds crm_customer on SQLite, dropping its triggers.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CUSTOMER_SEARCH_TRIGGERS:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0008_watermark'),
+    ]
+
+    operations = [
+        # Runs last when unapplying, after the column is removed.
+        migrations.RunPython(migrations.RunPython.noop, reinstall_search_triggers),
+        migrations.AddField(
+            model_name='customer',
+            name='last_activity_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_from_orders, migrations.RunPython.noop),
+        migrations.RunPython(reinstall_search_triggers, migrations.RunPython.noop),
+    ]
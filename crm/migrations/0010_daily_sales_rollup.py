@@ -0,0 +1,91 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:43
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+# crm_customer's search triggers as 0006 created them, frozen here so later
+# changes to the search index cannot rewrite this migration.
+CUSTOMER_SEARCH_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS crm_customer_fts_ai",
+    "DROP TRIGGER IF EXISTS crm_customer_fts_ad",
+    "DROP TRIGGER IF EXISTS crm_customer_fts_au",
+    "CREATE TRIGGER crm_customer_fts_ai AFTER INSERT ON crm_customer BEGIN "
+    "INSERT INTO crm_customer_fts(rowid, name, email, phone) VALUES (new.id, new.name, new.email, new.phone); END",
+    "CREATE TRIGGER crm_customer_fts_ad AFTER DELETE ON crm_customer BEGIN "
+    "INSERT INTO crm_customer_fts(crm_customer_fts, rowid, name, email, phone) "
+    "VALUES ('delete', old.id, old.name, old.email, old.phone); END",
+    "CREATE TRIGGER crm_customer_fts_au AFTER UPDATE OF name, email, phone ON crm_customer BEGIN "
+    "INSERT INTO crm_customer_fts(crm_customer_fts, rowid, name, email, phone) "
+    "VALUES ('delete', old.id, old.name, old.email, old.phone); "
+    "INSERT INTO crm_customer_fts(rowid, name, email, phone) VALUES (new.id, new.name, new.email, new.phone); END",
+    "INSERT INTO crm_customer_fts(crm_customer_fts) VALUES ('rebuild')",
+]
+
+
+def backfill_created_at(apps, schema_editor):
+    # Best available guess for existing customers: their first order.
+    Customer = apps.get_model('crm', 'Customer')
+    Order = apps.get_model('crm', 'Order')
+    first = (
+        Order.objects.filter(customer=OuterRef('pk'))
+        .values('customer')
+        .annotate(first=Min('order_date'))
+        .values('first')
+    )
+    Customer.objects.filter(orders__isnull=False).distinct().update(created_at=Subquery(first))
+
+    # Customers without orders would all keep the migration time and count as
+    # new customers on that day. Ids grow with time, so take the guess of the
+    # closest earlier customer with orders, or else the first order of all.
+    earliest = Order.objects.aggregate(first=Min('order_date'))['first']
+    if earliest is None:
+        return
+    previous = (
+        Customer.objects.filter(pk__lt=OuterRef('pk'), orders__isnull=False)
+        .order_by('-pk')
+        .values('created_at')[:1]
+    )
+    Customer.objects.filter(orders__isnull=True).update(
+        created_at=Coalesce(Subquery(previous), Value(earliest), output_field=models.DateTimeField())
+    )
+
+
+def reinstall_search_triggers(apps, schema_editor):
+    # Adding or removing a column rebuilds crm_customer on SQLite, dropping its triggers.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CUSTOMER_SEARCH_TRIGGERS:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0009_customer_last_activity_at'),
+    ]
+
+    operations = [
+        # Runs last when unapplying, after the column is removed.
+        migrations.RunPython(migrations.RunPython.noop, reinstall_search_triggers),
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('new_customers', models.PositiveIntegerField(default=0)),
+                ('units_by_product', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+        migrations.RunPython(reinstall_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0010_daily_sales_rollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='order_date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
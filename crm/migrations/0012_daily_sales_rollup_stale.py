@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0011_order_date_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailysalesrollup',
+            name='stale',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,34 +1,187 @@
+from contextlib import contextmanager
+
 from django.db import models
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+
+@contextmanager
+def batched_side_effects():
+    """Apply the counter deltas and stale rollup dates of a delete once, not once per row."""
+    # Imported here: crm.counters and crm.rollups import these models.
+    from . import counters, rollups
+
+    with counters.batched(), rollups.batched():
+        yield
+
+
+class CountedQuerySet(models.QuerySet):
+    """Deletes adjust the crm.counters totals and flag crm.rollups days once, rather than per row."""
+
+    def delete(self):
+        with batched_side_effects():
+            return super().delete()
+
+
+class CountedModel(models.Model):
+    objects = CountedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
 
-class Customer(models.Model):
+    def delete(self, *args, **kwargs):
+        with batched_side_effects():
+            return super().delete(*args, **kwargs)
+
+
+class Customer(CountedModel):
     name = models.CharField(max_length=255)
     email = models.EmailField(unique=True)
     phone = models.CharField(max_length=20, blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    # Bumped whenever the customer places an order; drives inactive-customer cleanup.
+    last_activity_at = models.DateTimeField(default=timezone.now, db_index=True)
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def touch(cls, activity, batch_size=1000):
+        """Record activity, ``{customer pk: when}``, one UPDATE per ``batch_size`` customers.
+
+        ``last_activity_at`` only moves forward: a back-dated order (an import
+        or a replay) must not make an active customer look inactive. Each
+        customer binds three parameters, so batches keep an UPDATE under
+        SQLite's variable limit.
+        """
+        items = list(activity.items())
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            when = models.Case(
+                *(models.When(pk=pk, then=models.Value(at)) for pk, at in batch),
+                output_field=models.DateTimeField(),
+            )
+            cls.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+                last_activity_at=Greatest("last_activity_at", when)
+            )
+
 
 class Product(models.Model):
-    name = models.CharField(max_length=255)
+    name = models.CharField(max_length=255, unique=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
+    # Restock when stock drops below this; falls back to the mutation's threshold.
+    reorder_point = models.PositiveIntegerField(blank=True, null=True)
+
+    class Meta:
+        # ProductFilter ranges and the low-stock restock.
+        indexes = [
+            models.Index(fields=["stock"]),
+            models.Index(fields=["price"]),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Order(models.Model):
+class Order(CountedModel):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="orders")
-    products = models.ManyToManyField(Product, related_name="orders")
-    order_date = models.DateTimeField(auto_now_add=True)
+    products = models.ManyToManyField(Product, related_name="orders", through="OrderItem")
+    # A default rather than auto_now_add, so imports and seeds can set past dates.
+    order_date = models.DateTimeField(default=timezone.now)
     total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
+    class Meta:
+        # OrderFilter ranges, the reminder job's date window and a customer's
+        # orders by date.
+        indexes = [
+            models.Index(fields=["order_date"]),
+            models.Index(fields=["total_amount"]),
+            models.Index(fields=["customer", "order_date"]),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        order = super().from_db(db, field_names, values)
+        # The stored values, so a save that changes them can move the revenue
+        # counter and flag the rollup of the day the order used to be on.
+        order._loaded_values = {name: order.__dict__.get(name) for name in ("total_amount", "order_date")}
+        return order
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # After the post_save receivers, which compare against the old values.
+        self._loaded_values = {"total_amount": self.total_amount, "order_date": self.order_date}
+
     def calculate_total(self):
-        total = sum([p.price for p in self.products.all()])
+        total = sum([item.product.price * item.quantity for item in self.items.select_related("product")])
         self.total_amount = total
         self.save()
         return total
 
     def __str__(self):
         return f"Order {self.id} - {self.customer.name}"
+
+
+class OrderItem(models.Model):
+    """One product line of an order. Uses the table of the former auto-created M2M."""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="order_items")
+    quantity = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        db_table = "crm_order_products"
+        unique_together = [("order", "product")]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} (order {self.order_id})"
+
+
+class Counter(models.Model):
+    """Running totals (customers, orders, revenue) maintained alongside writes.
+
+    Rows are updated with ``F()`` in the same transaction as the write that
+    changes them, so reading a total is a primary-key lookup instead of a
+    full-table ``COUNT``/``SUM``. ``manage.py rebuild_counters`` reconciles them.
+    """
+    CUSTOMERS = "customers"
+    ORDERS = "orders"
+    REVENUE = "revenue"
+
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
+
+class Watermark(models.Model):
+    """How far an incremental job has got, e.g. the last order id it handled."""
+    ORDER_REMINDERS = "order_reminders"
+
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
+
+class DailySalesRollup(models.Model):
+    """Per-day sales totals, so reports read O(days) rows instead of every order.
+
+    Maintained by ``crm.rollups`` (the ``update_daily_rollups`` task and
+    ``manage.py backfill_rollups``); individual writes only flag a day stale.
+    """
+    date = models.DateField(primary_key=True)
+    orders = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    new_customers = models.PositiveIntegerField(default=0)
+    # Set by writes to an older day (crm.rollups.mark_stale); cleared when recomputed.
+    stale = models.BooleanField(default=False)
+    # {product_id: units sold}; keys are strings, as JSON requires.
+    units_by_product = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.date}: {self.orders} orders, {self.revenue}"
@@ -0,0 +1,98 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, QuerySet
+from graphene.utils.str_converters import to_snake_case
+from graphene_django.registry import get_global_registry
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+
+def optimize(queryset, info):
+    """Shape ``queryset`` after the selection set of the field being resolved.
+
+    Selected columns become ``only()``, forward relations ``select_related()``,
+    reverse and many-to-many relations a tree of ``Prefetch`` objects, and
+    fields listed in a type's ``optimizer_annotations`` are annotated.
+    Relay connections are unwrapped through ``edges { node }``.
+    """
+    if not isinstance(queryset, QuerySet):
+        return queryset
+    return _optimize(queryset, _node_fields(info.field_nodes, info), info)
+
+
+def _collect(nodes, info, fields=None):
+    fields = {} if fields is None else fields
+    for node in nodes:
+        if node.selection_set is None:
+            continue
+        for selection in node.selection_set.selections:
+            if isinstance(selection, FieldNode):
+                fields.setdefault(selection.name.value, []).append(selection)
+            elif isinstance(selection, FragmentSpreadNode):
+                _collect([info.fragments[selection.name.value]], info, fields)
+            elif isinstance(selection, InlineFragmentNode):
+                _collect([selection], info, fields)
+    return fields
+
+
+def _node_fields(nodes, info):
+    fields = _collect(nodes, info)
+    if "edges" in fields:
+        edges = _collect(fields["edges"], info)
+        fields = _collect(edges.get("node", []), info)
+    return fields
+
+
+def _annotations_for(model):
+    graphene_type = get_global_registry().get_type_for_model(model)
+    return getattr(graphene_type, "optimizer_annotations", {})
+
+
+def _optimize(queryset, fields, info, required=()):
+    only, select, prefetch, annotations = _plan(queryset.model, fields, info)
+    only.update(required)
+    if annotations:
+        queryset = queryset.annotate(**annotations)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset.only(*only)
+
+
+def _plan(model, fields, info, prefix=""):
+    only = {prefix + model._meta.pk.name}
+    select, prefetch, annotations = [], [], {}
+    hints = _annotations_for(model) if not prefix else {}
+
+    for name, nodes in fields.items():
+        attr = to_snake_case(name)
+        if attr in hints:
+            annotations[attr] = hints[attr]
+            continue
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            continue
+
+        if field.many_to_many or field.one_to_many:
+            child = field.related_model._default_manager.all()
+            # Reverse FK prefetches match rows on the remote foreign key.
+            required = (field.field.name,) if field.one_to_many else ()
+            prefetch.append(
+                Prefetch(
+                    prefix + attr,
+                    queryset=_optimize(child, _node_fields(nodes, info), info, required),
+                )
+            )
+        elif field.concrete and field.is_relation:
+            only.add(prefix + attr)
+            select.append(prefix + attr)
+            sub_only, sub_select, sub_prefetch, _ = _plan(
+                field.related_model, _collect(nodes, info), info, prefix + attr + "__"
+            )
+            only |= sub_only
+            select.extend(sub_select)
+            prefetch.extend(sub_prefetch)
+        elif field.concrete:
+            only.add(prefix + attr)
+
+    return only, select, prefetch, annotations
@@ -0,0 +1,77 @@
+import datetime
+
+from django.utils import timezone
+
+from .fields import keyset_cursor, parse_keyset_cursor
+from .graphql_client import execute
+from .metrics import track_job
+from .models import Watermark
+
+NEW_ORDERS = """
+    query NewOrders($first: Int!, $after: String, $cutoff: Date!) {
+        allOrdersKeyset(first: $first, after: $after, orderBy: "id", orderDate_Gte: $cutoff) {
+            edges {
+                node {
+                    id
+                    customer {
+                        email
+                    }
+                }
+            }
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+        }
+    }
+"""
+
+
+def send_order_reminders(log_path="/tmp/order_reminders_log.txt", chunk_size=100, window_days=7):
+    """Log one reminder per customer for orders placed since the last run.
+
+    Orders are read in id order, ``chunk_size`` at a time, after the id stored
+    in the ``order_reminders`` watermark; the watermark moves forward after
+    every chunk so a failed run resumes where it stopped. Orders older than
+    ``window_days`` are never reminded, which also bounds the first run.
+    ``chunk_size`` may not exceed RELAY_CONNECTION_MAX_LIMIT. Returns ``(orders, reminders)`` processed.
+    """
+    with track_job("order_reminders") as run:
+        run.rows, reminders = _send_order_reminders(log_path, chunk_size, window_days)
+    return run.rows, reminders
+
+
+def _send_order_reminders(log_path, chunk_size, window_days):
+    watermark, _ = Watermark.objects.get_or_create(name=Watermark.ORDER_REMINDERS)
+    # A date; OrderFilter reads it as midnight in the current time zone.
+    cutoff = (timezone.localdate() - datetime.timedelta(days=window_days)).isoformat()
+    after = keyset_cursor("id", watermark.value, watermark.value) if watermark.value else None
+    reminded = set()
+    orders = reminders = 0
+
+    while True:
+        page = execute(NEW_ORDERS, {"first": chunk_size, "after": after, "cutoff": cutoff})["allOrdersKeyset"]
+        if not page["edges"]:
+            break
+
+        by_customer = {}
+        for edge in page["edges"]:
+            by_customer.setdefault(edge["node"]["customer"]["email"], []).append(edge["node"]["id"])
+        orders += len(page["edges"])
+
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with open(log_path, "a") as log:
+            for email, order_ids in by_customer.items():
+                if email in reminded:
+                    continue
+                reminded.add(email)
+                reminders += 1
+                log.write(f"{timestamp} - Order ID: {', '.join(order_ids)}, Customer Email: {email}\n")
+
+        after = page["pageInfo"]["endCursor"]
+        watermark.value = parse_keyset_cursor(after, "id")[1]
+        watermark.save(update_fields=["value", "updated_at"])
+        if not page["pageInfo"]["hasNextPage"]:
+            break
+
+    return orders, reminders
@@ -0,0 +1,164 @@
+"""Maintain ``DailySalesRollup`` and read reports from it.
+
+A day is always recomputed as a whole from the indexed ``order_date`` and
+``created_at`` ranges, so re-running a day is idempotent and picks up
+deletes. Three grouped queries cover any span of days: orders, order lines
+by product, and new customers.
+
+``refresh_recent()`` recomputes the last ``RECENT_DAYS`` days plus every
+older day a write has flagged with ``mark_stale()`` (a back-dated order,
+the delete of an old one), so reports never wait for a manual backfill.
+"""
+import datetime
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Customer, DailySalesRollup, Order, OrderItem
+
+
+# Days refresh_recent() recomputes on every run; writes only flag older days.
+RECENT_DAYS = 2
+
+_pending = threading.local()
+
+
+def day_of(value):
+    """The rollup date of ``value``, an ``order_date`` or ``created_at``."""
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def mark_stale(dates):
+    """Flag the rollups of ``dates`` for the next ``refresh_recent()``, with one upsert.
+
+    Days inside the recent window are skipped, so the common write (an order
+    placed today) costs nothing here.
+    """
+    first_recent = timezone.localdate() - datetime.timedelta(days=RECENT_DAYS - 1)
+    dates = {date for date in dates if date < first_recent}
+    if not dates:
+        return
+    pending = getattr(_pending, "dates", None)
+    if pending is not None:
+        pending.update(dates)
+        return
+    DailySalesRollup.objects.bulk_create(
+        [DailySalesRollup(date=date, stale=True) for date in dates],
+        update_conflicts=True,
+        unique_fields=["date"],
+        update_fields=["stale"],
+    )
+
+
+@contextmanager
+def batched():
+    """Collect the ``mark_stale()`` calls made in the block and flag them together at the end.
+
+    Used by deletes, like ``counters.batched()``; call inside the delete's transaction.
+    """
+    if getattr(_pending, "dates", None) is not None:
+        yield
+        return
+    _pending.dates = set()
+    try:
+        yield
+        dates = _pending.dates
+    finally:
+        _pending.dates = None
+    mark_stale(dates)
+
+
+def _bounds(start, end):
+    """Aware datetimes covering the dates ``start`` through ``end`` inclusive."""
+    tz = timezone.get_current_timezone()
+    lo = datetime.datetime.combine(start, datetime.time.min, tzinfo=tz)
+    hi = datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min, tzinfo=tz)
+    return lo, hi
+
+
+def rollup_days(start, end):
+    """Recompute the rollups for ``start`` through ``end`` (dates, inclusive). Returns the day count."""
+    # Cleared before reading, so a write that lands meanwhile flags its day again.
+    DailySalesRollup.objects.filter(date__gte=start, date__lte=end, stale=True).update(stale=False)
+    lo, hi = _bounds(start, end)
+    days = {
+        start + datetime.timedelta(days=i): DailySalesRollup(date=start + datetime.timedelta(days=i))
+        for i in range((end - start).days + 1)
+    }
+
+    orders = (
+        Order.objects.filter(order_date__gte=lo, order_date__lt=hi)
+        .annotate(day=TruncDate("order_date"))
+        .values("day")
+        .annotate(orders=Count("pk"), revenue=Sum("total_amount"))
+    )
+    for row in orders:
+        days[row["day"]].orders = row["orders"]
+        days[row["day"]].revenue = row["revenue"] or Decimal("0")
+
+    units = (
+        OrderItem.objects.filter(order__order_date__gte=lo, order__order_date__lt=hi)
+        .annotate(day=TruncDate("order__order_date"))
+        .values("day", "product_id")
+        .annotate(units=Sum("quantity"))
+    )
+    for row in units:
+        days[row["day"]].units_by_product[str(row["product_id"])] = row["units"]
+
+    customers = (
+        Customer.objects.filter(created_at__gte=lo, created_at__lt=hi)
+        .annotate(day=TruncDate("created_at"))
+        .values("day")
+        .annotate(n=Count("pk"))
+    )
+    for row in customers:
+        days[row["day"]].new_customers = row["n"]
+
+    with transaction.atomic():
+        DailySalesRollup.objects.bulk_create(
+            days.values(),
+            update_conflicts=True,
+            unique_fields=["date"],
+            update_fields=["orders", "revenue", "new_customers", "units_by_product", "updated_at"],
+        )
+    return len(days)
+
+
+def refresh_recent():
+    """Recompute the last ``RECENT_DAYS`` days and every day flagged stale, for the scheduled task."""
+    today = timezone.localdate()
+    days = rollup_days(today - datetime.timedelta(days=RECENT_DAYS - 1), today)
+    stale = sorted(DailySalesRollup.objects.filter(stale=True).values_list("date", flat=True))
+    # One rollup_days() call per run of consecutive dates.
+    start = None
+    for i, date in enumerate(stale):
+        if start is None:
+            start = date
+        if i + 1 == len(stale) or stale[i + 1] != date + datetime.timedelta(days=1):
+            days += rollup_days(start, date)
+            start = None
+    return days
+
+
+def sales_report(start, end):
+    """Totals and a per-product breakdown for ``start`` through ``end``, read from the rollups."""
+    rows = list(DailySalesRollup.objects.filter(date__gte=start, date__lte=end).order_by("date"))
+    units = defaultdict(int)
+    for row in rows:
+        for product_id, n in row.units_by_product.items():
+            units[int(product_id)] += n
+    return {
+        "start": start,
+        "end": end,
+        "orders": sum(row.orders for row in rows),
+        "revenue": sum((row.revenue for row in rows), Decimal("0.00")),
+        "new_customers": sum(row.new_customers for row in rows),
+        "units_by_product": dict(units),
+        "days": rows,
+    }
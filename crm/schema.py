@@ -1,42 +1,193 @@
 import graphene
+from asgiref.sync import sync_to_async
 from graphene_django import DjangoObjectType
-from graphene_django.filter import DjangoFilterConnectionField
-from .models import Customer, Product, Order
+from .models import Counter, Customer, DailySalesRollup, Product, Order, OrderItem
+from . import counters
 from .filters import CustomerFilter, ProductFilter, OrderFilter
+from .aio import evaluate, in_event_loop, maybe_then
+from .caching import cached_resolver, invalidate_model
+from .inventory import reserve_stock, restock_low_stock
+from .fields import BatchedConnectionField, KeysetConnection, KeysetConnectionField
+from .loaders import get_loaders
+from .optimizer import optimize
+from .rollups import day_of, mark_stale, sales_report
+from .search import search_ids
+from .validators import customer_errors, product_errors
 from django.core.exceptions import ValidationError
-from django.db import transaction
-import re
-from datetime import datetime
-from decimal import Decimal, InvalidOperation
-
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
 
 
 # =====================
 # GraphQL Types
 # =====================
 class CustomerType(DjangoObjectType):
+    orders = BatchedConnectionField(lambda: OrderType, required=True)
+    order_count = graphene.Int()
+
+    # Computed fields the queryset optimizer annotates when they are selected.
+    optimizer_annotations = {"order_count": Count("orders")}
+
     class Meta:
         model = Customer
         # fields = ("id", "name", "email", "phone")
         interfaces = (graphene.relay.Node,)
         filterset_class = CustomerFilter
 
+    def resolve_orders(self, info, **kwargs):
+        if "orders" in getattr(self, "_prefetched_objects_cache", {}):
+            return list(self.orders.all())
+        return get_loaders(info).orders_by_customer.load(self.pk)
+
+    def resolve_order_count(self, info):
+        if hasattr(self, "order_count"):
+            return self.order_count
+        return maybe_then(get_loaders(info).orders_by_customer.load(self.pk), len)
+
 
 class ProductType(DjangoObjectType):
     class Meta:
         model = Product
-        fields = ("id", "name", "price", "stock")
+        fields = ("id", "name", "price", "stock", "reorder_point")
         interfaces = (graphene.relay.Node,)
         filterset_class = ProductFilter
 
 
+class OrderItemType(DjangoObjectType):
+    class Meta:
+        model = OrderItem
+        fields = ("product", "quantity")
+
+
 class OrderType(DjangoObjectType):
+    products = BatchedConnectionField(ProductType, required=True)
+    items = graphene.List(graphene.NonNull(OrderItemType), required=True)
+
     class Meta:
         model = Order
-        fields = ("id", "customer", "products", "total_amount", "order_date")
+        fields = ("id", "customer", "products", "items", "total_amount", "order_date")
         interfaces = (graphene.relay.Node,)
         filterset_class = OrderFilter
 
+    def resolve_customer(self, info):
+        if Order.customer.is_cached(self):
+            return self.customer
+        return get_loaders(info).customer.load(self.customer_id)
+
+    def resolve_products(self, info, **kwargs):
+        if "products" in getattr(self, "_prefetched_objects_cache", {}):
+            return list(self.products.all())
+        return get_loaders(info).products_by_order.load(self.pk)
+
+    def resolve_items(self, info):
+        if "items" in getattr(self, "_prefetched_objects_cache", {}):
+            return list(self.items.all())
+        return get_loaders(info).items_by_order.load(self.pk)
+
+# =====================
+# Keyset Connections
+# =====================
+class CustomerKeysetConnection(KeysetConnection):
+    sort_fields = ("id", "name", "email")
+
+    class Meta:
+        node = CustomerType
+
+
+class ProductKeysetConnection(KeysetConnection):
+    sort_fields = ("id", "name", "price", "stock")
+
+    class Meta:
+        node = ProductType
+
+
+class OrderKeysetConnection(KeysetConnection):
+    sort_fields = ("id", "order_date", "total_amount")
+
+    class Meta:
+        node = OrderType
+
+
+# =====================
+# Sales reports (read from DailySalesRollup)
+# =====================
+class ProductUnits(graphene.ObjectType):
+    product = graphene.Field(ProductType)
+    units = graphene.Int()
+
+    def resolve_product(root, info):
+        return get_loaders(info).product.load(root["product_id"])
+
+
+def product_units(info, units_by_product, limit=None):
+    """``{product_id: units}`` as ProductUnits rows, best sellers first.
+
+    The products are queued on the request's loader so every row of every day
+    is fetched with one query.
+    """
+    ranked = sorted(((int(pk), n) for pk, n in units_by_product.items()), key=lambda row: (-row[1], row[0]))
+    rows = [{"product_id": pk, "units": n} for pk, n in ranked[:limit]]
+    get_loaders(info).product.prepare(row["product_id"] for row in rows)
+    return rows
+
+
+class DailySalesType(DjangoObjectType):
+    products = graphene.List(ProductUnits)
+
+    class Meta:
+        model = DailySalesRollup
+        fields = ("date", "orders", "revenue", "new_customers")
+
+    def resolve_products(self, info):
+        return product_units(info, self.units_by_product)
+
+
+class SalesReport(graphene.ObjectType):
+    start = graphene.Date()
+    end = graphene.Date()
+    orders = graphene.Int()
+    revenue = graphene.Decimal()
+    new_customers = graphene.Int()
+    days = graphene.List(DailySalesType)
+    top_products = graphene.List(ProductUnits, limit=graphene.Int(default_value=10))
+
+    def resolve_days(root, info):
+        # Queue every day's products now; each day's list resolves before the next is reached.
+        get_loaders(info).product.prepare(int(pk) for day in root["days"] for pk in day.units_by_product)
+        return root["days"]
+
+    def resolve_top_products(root, info, limit=10):
+        return product_units(info, root["units_by_product"], limit)
+
+
+# =====================
+# Search
+# =====================
+def ranked(model, info, term, limit):
+    """Rows of ``model`` matching ``term`` in rank order, shaped by the selection set."""
+    def fetch():
+        ids = search_ids(model, term, limit)
+        rows = {obj.pk: obj for obj in optimize(model.objects.filter(pk__in=ids), info)}
+        return [rows[pk] for pk in ids if pk in rows]
+
+    # The FTS query uses a raw cursor, which has no async variant.
+    return sync_to_async(fetch)() if in_event_loop() else fetch()
+
+
+class SearchResults(graphene.ObjectType):
+    customers = graphene.List(graphene.NonNull(CustomerType), required=True)
+    products = graphene.List(graphene.NonNull(ProductType), required=True)
+
+    def resolve_customers(root, info):
+        return ranked(Customer, info, root["term"], root["limit"])
+
+    def resolve_products(root, info):
+        return ranked(Product, info, root["term"], root["limit"])
+
+
 # =====================
 # Input Types
 # =====================
@@ -51,9 +202,16 @@ class ProductInput(graphene.InputObjectType):
     stock = graphene.Int(default_value=0)
 
 
+class OrderItemInput(graphene.InputObjectType):
+    product_id = graphene.ID(required=True)
+    quantity = graphene.Int(default_value=1)
+
+
 class OrderInput(graphene.InputObjectType):
     customer_id = graphene.ID(required=True)
-    product_ids = graphene.List(graphene.ID, required=True)
+    # Each id is one unit; use ``items`` for quantities. Both may be given.
+    product_ids = graphene.List(graphene.ID)
+    items = graphene.List(OrderItemInput)
     order_date = graphene.DateTime()
 
 
@@ -75,9 +233,7 @@ class CreateCustomer(graphene.Mutation):
             errors.append(f"Email already exists: {input.email}")
 
         # Phone validation
-        if input.phone:
-            if not re.match(r"^\+?\d{1,3}[- ]?\d{3,}[- ]?\d{3,}$", input.phone):
-                errors.append(f"Invalid phone format: {input.phone}")
+        errors += customer_errors(input.phone)
 
         if errors:
             return CreateCustomer(customer=None, message="Failed to create customer", errors=errors)
@@ -86,41 +242,78 @@ class CreateCustomer(graphene.Mutation):
             name=input.name, 
             email=input.email, 
             phone=input.phone)
-        customer.save()
+        # The counter is bumped by post_save; keep it in the same transaction.
+        with transaction.atomic():
+            customer.save()
         return CreateCustomer(customer=customer, message="Customer created successfully", errors=None)
 
 
+class RowError(graphene.ObjectType):
+    index = graphene.Int(description="Position of the row in the input list")
+    message = graphene.String()
+
+
 class BulkCreateCustomers(graphene.Mutation):
     class Arguments:
         input = graphene.List(CustomerInput, required=True)
+        batch_size = graphene.Int(default_value=1000)
 
     customers = graphene.List(CustomerType)
     errors = graphene.List(graphene.String)
+    row_errors = graphene.List(RowError)
 
     @transaction.atomic
-    def mutate(self, info, input):
-        created_customers = []
-        errors = []
-
-        for data in input:
-            try:
-                # Notice: now we access fields as attributes (not dict keys)
-                if Customer.objects.filter(email=data.email).exists():
-                    errors.append(f"Email already exists: {data.email}")
-                    continue
-
-                if data.phone and not re.match(r"^\+?\d{1,3}[- ]?\d{3,}[- ]?\d{3,}$", data.phone):
-                    errors.append(f"Invalid phone format: {data.phone}")
-                    continue
-
-                customer = Customer(name=data.name, email=data.email, phone=data.phone)
-                customer.save()
-                created_customers.append(customer)
-            except Exception as e:
-                errors.append(str(e))
-
-        return BulkCreateCustomers(customers=created_customers, errors=errors)
+    def mutate(self, info, input, batch_size=1000):
+        batch_size = max(batch_size, 1)
+        row_errors = []
+        seen = set()
+        candidates = []
+
+        for index, data in enumerate(input):
+            if data.email in seen:
+                row_errors.append(RowError(index=index, message=f"Duplicate email in batch: {data.email}"))
+                continue
+            errors = customer_errors(data.phone)
+            if errors:
+                row_errors += [RowError(index=index, message=m) for m in errors]
+                continue
+            # Only a valid row claims its email; a later valid row may still use it.
+            seen.add(data.email)
+            candidates.append((index, data))
+
+        # One uniqueness probe per chunk instead of one query per row.
+        emails = [data.email for _, data in candidates]
+        existing = set()
+        for start in range(0, len(emails), batch_size):
+            existing.update(
+                Customer.objects.filter(email__in=emails[start:start + batch_size]).values_list("email", flat=True)
+            )
+
+        new_customers = []
+        for index, data in candidates:
+            if data.email in existing:
+                row_errors.append(RowError(index=index, message=f"Email already exists: {data.email}"))
+                continue
+            new_customers.append(Customer(name=data.name, email=data.email, phone=data.phone))
 
+        try:
+            with transaction.atomic():
+                created_customers = Customer.objects.bulk_create(new_customers, batch_size=batch_size)
+        except IntegrityError as e:
+            # Another writer inserted one of these emails after the probe.
+            created_customers = []
+            row_errors.append(RowError(index=None, message=f"Batch rejected, retry: {e}"))
+
+        # bulk_create sends no signals, so bump the cache versions by hand.
+        if created_customers:
+            invalidate_model(Customer)
+        counters.increment(Counter.CUSTOMERS, len(created_customers))
+        row_errors.sort(key=lambda e: -1 if e.index is None else e.index)
+        return BulkCreateCustomers(
+            customers=created_customers,
+            errors=[e.message if e.index is None else f"Row {e.index}: {e.message}" for e in row_errors],
+            row_errors=row_errors,
+        )
 
 
 class CreateProduct(graphene.Mutation):
@@ -131,17 +324,9 @@ class CreateProduct(graphene.Mutation):
     errors = graphene.List(graphene.String)
 
     def mutate(self, info, input):
-        errors = []
-        # Safely convert float to Decimal
-        try:
-            price_decimal = Decimal(str(input.price))
-        except (InvalidOperation, ValueError):
-            errors.append("Invalid price format. Must be a valid number.")
-
-        if input.price <= 0:
-            errors.append("Price must be positive.")
-        if input.stock < 0:
-            errors.append("Stock cannot be negative.")
+        price_decimal, errors = product_errors(input.price, input.stock)
+        if Product.objects.filter(name=input.name).exists():
+            errors.append(f"Product name already exists: {input.name}")
         if errors:
             return CreateProduct(product=None, errors=errors)
 
@@ -150,6 +335,24 @@ class CreateProduct(graphene.Mutation):
         return CreateProduct(product=product, errors=None)
 
 
+def order_lines(input):
+    """Merge ``productIds``/``items`` of an OrderInput into ``({product_id: qty}, errors)``."""
+    quantities, errors = {}, []
+    lines = [(pid, 1) for pid in input.product_ids or []]
+    lines += [(item.product_id, item.quantity) for item in input.items or []]
+    for pid, qty in lines:
+        try:
+            pid = int(pid)
+        except (TypeError, ValueError):
+            errors.append(f"Invalid product ID: {pid}")
+            continue
+        if qty is None or qty < 1:
+            errors.append(f"Quantity must be positive for product {pid}")
+            continue
+        quantities[pid] = quantities.get(pid, 0) + qty
+    return quantities, errors
+
+
 class CreateOrder(graphene.Mutation):
     class Arguments:
         input = OrderInput(required=True)
@@ -158,62 +361,171 @@ class CreateOrder(graphene.Mutation):
     errors = graphene.List(graphene.String)
 
     def mutate(self, info, input):
-        errors = []
         try:
             customer = Customer.objects.get(id=input.customer_id)
-        except Customer.DoesNotExist:
-            errors.append(f"Invalid customer ID: {input.customer_id}")
-            return CreateOrder(order=None, errors=errors)
-
+        except (Customer.DoesNotExist, ValueError):
+            return CreateOrder(order=None, errors=[f"Invalid customer ID: {input.customer_id}"])
 
-        products = []
-        for pid in input.product_ids:
-            try:
-                product = Product.objects.get(id=pid)
-                products.append(product)
-            except Product.DoesNotExist:
-                errors.append(f"Invalid product ID: {pid}")
+        quantities, errors = order_lines(input)
+        products = Product.objects.in_bulk(list(quantities))
+        errors += [f"Invalid product ID: {pid}" for pid in quantities if pid not in products]
 
         if not products:
             errors.append("No valid products provided")
 
         if errors:
             return CreateOrder(order=None, errors=errors)
-        total_amount = sum(p.price for p in products)
-        
-        order = Order(
-            customer=customer, 
-            order_date=input.order_date or datetime.now())
-        order.save()
-        
-        order.products.set(products)
-        total = sum([p.price for p in products], Decimal("0.00"))
-        order.total_amount = total
-        order.save()
+
+        total = sum((products[pid].price * qty for pid, qty in quantities.items()), Decimal("0.00"))
+
+        with transaction.atomic():
+            if not reserve_stock(quantities):
+                transaction.set_rollback(True)
+                short = [
+                    f"Insufficient stock for product {pid}: requested {qty}"
+                    for pid, qty in quantities.items()
+                    if products[pid].stock < qty
+                ] or ["Insufficient stock"]
+                return CreateOrder(order=None, errors=short)
+
+            order = Order(
+                customer=customer, 
+                order_date=input.order_date or timezone.now(),
+                total_amount=total)
+            order.save()
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, product_id=pid, quantity=qty)
+                for pid, qty in quantities.items()
+            )
 
         return CreateOrder(order=order, errors=None)
     
+class BulkCreateOrders(graphene.Mutation):
+    class Arguments:
+        input = graphene.List(graphene.NonNull(OrderInput), required=True)
+        all_or_nothing = graphene.Boolean(default_value=False)
+        batch_size = graphene.Int(default_value=1000)
+
+    orders = graphene.List(OrderType)
+    errors = graphene.List(graphene.String)
+    row_errors = graphene.List(RowError)
+
+    def mutate(self, info, input, all_or_nothing=False, batch_size=1000):
+        batch_size = max(batch_size, 1)
+        row_errors = []
+        rows = []
+
+        for index, data in enumerate(input):
+            quantities, errors = order_lines(data)
+            if not quantities and not errors:
+                errors.append("No valid products provided")
+            try:
+                customer_id = int(data.customer_id)
+            except (TypeError, ValueError):
+                errors.append(f"Invalid customer ID: {data.customer_id}")
+            row_errors += [RowError(index=index, message=m) for m in errors]
+            if not errors:
+                rows.append((index, customer_id, quantities, data.order_date))
+
+        # Two lookups for the whole batch, whatever its size.
+        customers = Customer.objects.in_bulk({customer_id for _, customer_id, _, _ in rows})
+        products = Product.objects.in_bulk({pid for _, _, quantities, _ in rows for pid in quantities})
+
+        # Stock is allocated in input order, so later rows are the ones rejected.
+        stock = {pk: product.stock for pk, product in products.items()}
+        accepted, reserved = [], {}
+        for index, customer_id, quantities, order_date in rows:
+            errors = []
+            if customer_id not in customers:
+                errors.append(f"Invalid customer ID: {customer_id}")
+            errors += [f"Invalid product ID: {pid}" for pid in quantities if pid not in products]
+            if not errors:
+                errors += [
+                    f"Insufficient stock for product {pid}: requested {qty}"
+                    for pid, qty in quantities.items()
+                    if stock[pid] < qty
+                ]
+            if errors:
+                row_errors += [RowError(index=index, message=m) for m in errors]
+                continue
+            for pid, qty in quantities.items():
+                stock[pid] -= qty
+                reserved[pid] = reserved.get(pid, 0) + qty
+            total = sum((products[pid].price * qty for pid, qty in quantities.items()), Decimal("0.00"))
+            accepted.append((Order(
+                customer=customers[customer_id],
+                order_date=order_date or timezone.now(),
+                total_amount=total,
+            ), quantities))
+
+        if all_or_nothing and row_errors:
+            accepted = []
+
+        created = []
+        with transaction.atomic():
+            if accepted and not reserve_stock(reserved):
+                # A concurrent order took stock after the lookup.
+                transaction.set_rollback(True)
+                accepted = []
+                row_errors.append(RowError(index=None, message="Batch rejected, stock changed; retry"))
+            if accepted:
+                created = Order.objects.bulk_create([order for order, _ in accepted], batch_size=batch_size)
+                OrderItem.objects.bulk_create(
+                    (
+                        OrderItem(order=order, product_id=pid, quantity=qty)
+                        for order, (_, quantities) in zip(created, accepted)
+                        for pid, qty in quantities.items()
+                    ),
+                    batch_size=batch_size,
+                )
+                # bulk_create sends no signals; record activity as the post_save
+                # receiver does, at each customer's latest order_date.
+                activity = {}
+                for order in created:
+                    activity[order.customer_id] = max(order.order_date, activity.get(order.customer_id, order.order_date))
+                Customer.touch(activity, batch_size)
+                mark_stale(day_of(order.order_date) for order in created)
+                invalidate_model(Order)
+                invalidate_model(Customer)
+                counters.increment(Counter.ORDERS, len(created))
+                counters.increment(Counter.REVENUE, sum((o.total_amount for o in created), Decimal("0.00")))
+
+        row_errors.sort(key=lambda e: -1 if e.index is None else e.index)
+        return BulkCreateOrders(
+            orders=get_loaders(info).prepare(Order, created),
+            errors=[e.message if e.index is None else f"Row {e.index}: {e.message}" for e in row_errors],
+            row_errors=row_errors,
+        )
+
+
 class UpdateLowStockProducts(graphene.Mutation):
     class Arguments:
-        # no input args, just restock all low-stock products
-        pass
+        threshold = graphene.Int(default_value=10, description="Used for products without a reorderPoint")
+        amount = graphene.Int(default_value=10)
+        batch_size = graphene.Int(default_value=1000)
 
+    updated_ids = graphene.List(graphene.ID)
+    count = graphene.Int()
     updated_products = graphene.List(ProductType)
     message = graphene.String()
 
-    def mutate(self, info):
-        low_stock_products = Product.objects.filter(stock__lt=10)
-        updated = []
-        for product in low_stock_products:
-            product.stock += 10  # simulate restocking
-            product.save()
-            updated.append(product)
+    def mutate(self, info, threshold, amount, batch_size):
+        if amount < 1 or batch_size < 1:
+            return UpdateLowStockProducts(updated_ids=[], count=0, message="amount and batchSize must be positive.")
 
+        ids = restock_low_stock(threshold, amount, batch_size)
         return UpdateLowStockProducts(
-            updated_products=updated,
+            updated_ids=ids,
+            count=len(ids),
             message="Low-stock products have been restocked successfully!"
         )
 
+    def resolve_updated_products(self, info):
+        # Only loaded when the client selects it.
+        if not self.updated_ids:
+            return []
+        return optimize(Product.objects.filter(pk__in=self.updated_ids).order_by("pk"), info)
+
 class Mutation(graphene.ObjectType):
     update_low_stock_products = UpdateLowStockProducts.Field()
     
@@ -222,9 +534,25 @@ class Mutation(graphene.ObjectType):
 # =====================
 class Query(graphene.ObjectType):
     hello = graphene.String(default_value="Hello, GraphQL!")
-    all_customers = DjangoFilterConnectionField(CustomerType)
-    all_products = DjangoFilterConnectionField(ProductType)
-    all_orders = DjangoFilterConnectionField(OrderType)
+    # O(1) totals read from crm.counters, not COUNT/SUM over the tables.
+    total_customers = graphene.Int()
+    total_orders = graphene.Int()
+    total_revenue = graphene.Decimal()
+    all_customers = BatchedConnectionField(CustomerType)
+    all_products = BatchedConnectionField(ProductType, cache_ttl=60, cache_models=(Product,))
+    all_orders = BatchedConnectionField(OrderType)
+    # Opt-in keyset (seek) pagination: cursors encode the sort key and id.
+    all_customers_keyset = KeysetConnectionField(CustomerKeysetConnection)
+    all_products_keyset = KeysetConnectionField(ProductKeysetConnection)
+    all_orders_keyset = KeysetConnectionField(OrderKeysetConnection)
+    # Dashboard/report totals from DailySalesRollup; defaults to the last 7 days.
+    sales_report = graphene.Field(SalesReport, start=graphene.Date(), end=graphene.Date())
+    # Ranked prefix search (FTS5 on SQLite) for type-ahead.
+    search = graphene.Field(
+        SearchResults,
+        term=graphene.String(required=True),
+        limit=graphene.Int(default_value=10),
+    )
     # -------------------- Customers --------------------
     customers = graphene.List(
         CustomerType,
@@ -251,16 +579,35 @@ class Query(graphene.ObjectType):
         product_name=graphene.String()
     )
 
+    def resolve_sales_report(self, info, start=None, end=None):
+        end = end or timezone.localdate()
+        start = start or end - timedelta(days=6)
+        if in_event_loop():
+            return sync_to_async(sales_report)(start, end)
+        return sales_report(start, end)
 
+    def resolve_search(self, info, term, limit=10):
+        return {"term": term, "limit": min(max(limit, 1), 50)}
+
+    def resolve_total_customers(self, info):
+        return maybe_then(counters.read(Counter.CUSTOMERS), int)
+
+    def resolve_total_orders(self, info):
+        return maybe_then(counters.read(Counter.ORDERS), int)
+
+    def resolve_total_revenue(self, info):
+        return counters.read(Counter.REVENUE)
+
+    @cached_resolver(ttl=30, models=(Customer, Order, Product))
     def resolve_customers(self, info, name=None, email=None):
         qs = Customer.objects.all()
         if name:
             qs = qs.filter(name__icontains=name)
         if email:
             qs = qs.filter(email__icontains=email)
-        return qs
-
+        return evaluate(optimize(qs, info))
 
+    @cached_resolver(ttl=60, models=(Product,))
     def resolve_products(self, info, name=None, price_gte=None, price_lte=None, stock_gte=None, stock_lte=None):
         qs = Product.objects.all()
         if name:
@@ -273,10 +620,10 @@ class Query(graphene.ObjectType):
             qs = qs.filter(stock__gte=stock_gte)
         if stock_lte is not None:
             qs = qs.filter(stock__lte=stock_lte)
-        return qs
+        return evaluate(optimize(qs, info))
 
     def resolve_orders(self, info, total_amount_gte=None, total_amount_lte=None, customer_name=None, product_name=None):
-        qs = Order.objects.select_related("customer").prefetch_related("products").all()
+        qs = Order.objects.all()
         if total_amount_gte is not None:
             qs = qs.filter(total_amount__gte=total_amount_gte)
         if total_amount_lte is not None:
@@ -284,13 +631,14 @@ class Query(graphene.ObjectType):
         if customer_name:
             qs = qs.filter(customer__name__icontains=customer_name)
         if product_name:
-            qs = qs.filter(product__name__icontains=product_name)
-        return qs
+            qs = qs.filter(products__name__icontains=product_name).distinct()
+        return evaluate(optimize(qs, info))
 
 class Mutation(graphene.ObjectType):
     create_customer = CreateCustomer.Field()
     bulk_create_customers = BulkCreateCustomers.Field()
     create_product = CreateProduct.Field()
     create_order = CreateOrder.Field()
+    bulk_create_orders = BulkCreateOrders.Field()
     update_low_stock_products = UpdateLowStockProducts.Field()
 
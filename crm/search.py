@@ -0,0 +1,45 @@
+"""Ranked prefix search over customers and products.
+
+On SQLite this reads the FTS5 tables created by migration 0006 (kept in sync
+by triggers), so a lookup is an index probe ranked by ``bm25()`` instead of a
+``LIKE '%term%'`` scan. Other databases fall back to ``icontains``.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Customer, Product
+
+SEARCH_FIELDS = {
+    Customer: ("name", "email", "phone"),
+    Product: ("name",),
+}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_query(term):
+    """Turn free text into an FTS5 query where every word is a prefix: ``"jo"* AND "sm"*``."""
+    return " AND ".join(f'"{token}"*' for token in _TOKEN_RE.findall(term))
+
+
+def search_ids(model, term, limit=10):
+    """Primary keys of ``model`` rows matching ``term``, best match first."""
+    query = fts_query(term)
+    if not query:
+        return []
+    if connection.vendor != "sqlite":
+        match = Q()
+        for field in SEARCH_FIELDS[model]:
+            match |= Q(**{f"{field}__icontains": term})
+        return list(model.objects.filter(match).order_by("pk").values_list("pk", flat=True)[:limit])
+
+    table = f"{model._meta.db_table}_fts"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {table} WHERE {table} MATCH %s ORDER BY bm25({table}) LIMIT %s",
+            [query, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
@@ -1,3 +1,5 @@
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -73,9 +75,33 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Reuse connections (and their page cache) across requests.
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # atomic() takes the write lock at BEGIN, waiting up to busy_timeout.
+            # A deferred transaction that reads and then writes cannot wait for
+            # it and fails at once with "database is locked". Every atomic block
+            # in crm writes.
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Applied to every new SQLite connection by crm.signals.configure_sqlite.
+SQLITE_PRAGMAS = {
+    # Readers and the writer no longer block each other.
+    "journal_mode": "WAL",
+    # With WAL, only an OS crash or power loss can drop the last commits;
+    # the database is never corrupted.
+    "synchronous": "NORMAL",
+    # Milliseconds to wait for a lock before raising "database is locked".
+    "busy_timeout": 5000,
+    "cache_size": -64000,  # KiB, per connection
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -120,7 +146,32 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 GRAPHENE = {
-    "SCHEMA": "alx_backend_graphql_crm.schema.schema"
+    "SCHEMA": "alx_backend_graphql_crm.schema.schema",
+    # Setting this also keeps out DjangoDebugMiddleware, which graphene-django
+    # adds when DEBUG is on: the schema has no _debug field to report through,
+    # so it would only wrap every cursor (and can leave the wrapper installed).
+    # crm.tracing times resolvers and files SQL by field path; send an
+    # X-GraphQL-Trace header (DEBUG or staff) to get it in the response.
+    "MIDDLEWARE": ["crm.tracing.TracingMiddleware"],
+}
+
+# Same query shape this many times under one field path is reported as N+1.
+GRAPHQL_N_PLUS_ONE_THRESHOLD = 3
+
+# /metrics: every worker process keeps its samples in a file here (crm.metrics).
+# Use a directory all workers share, and empty it when the service restarts.
+CRM_METRICS_DIR = os.environ.get("CRM_METRICS_DIR", os.path.join(tempfile.gettempdir(), "crm-metrics"))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# GraphQL read results (crm.caching) and persisted queries live here. Use a
+# shared backend (file-based, Redis, ...) when running several workers.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
 }
 
 
@@ -141,4 +192,8 @@ CELERY_BEAT_SCHEDULE = {
         "task": "crm.tasks.generate_crm_report",
         "schedule": crontab(day_of_week="mon", hour=6, minute=0),  # every Monday 6:00 AM
     },
+    "update-daily-rollups": {
+        "task": "crm.tasks.update_daily_rollups",
+        "schedule": crontab(minute="*/15"),  # keeps today's and yesterday's rollups fresh
+    },
 }
@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import counters, rollups
+from .caching import invalidate_model
+from .models import Counter, Customer, Order, Product
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Customer)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Order)
+def invalidate_cached_results(sender, **kwargs):
+    invalidate_model(sender)
+
+
+@receiver(m2m_changed, sender=Order.products.through)
+def invalidate_order_products(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_model(Order)
+        # The order lines changed the units sold on the orders' days.
+        if not reverse:
+            rollups.mark_stale({rollups.day_of(instance.order_date)})
+        elif pk_set:
+            dates = Order.objects.filter(pk__in=pk_set).values_list("order_date", flat=True)
+            rollups.mark_stale({rollups.day_of(date) for date in dates})
+
+
+# Rows created one at a time are counted here, whatever created them (the
+# API, the admin, the shell); bulk_create sends no signals, so bulk paths
+# call counters.increment() themselves. Deletes add up through
+# CountedQuerySet.delete().
+@receiver(post_save, sender=Customer)
+def count_saved_customer(sender, instance, created, **kwargs):
+    if created:
+        counters.increment(Counter.CUSTOMERS)
+
+
+@receiver(post_save, sender=Order)
+def count_saved_order(sender, instance, created, **kwargs):
+    if created:
+        counters.increment(Counter.ORDERS)
+        counters.increment(Counter.REVENUE, instance.total_amount)
+    else:
+        counted = getattr(instance, "_loaded_values", {}).get("total_amount")
+        if counted is not None:
+            counters.increment(Counter.REVENUE, instance.total_amount - counted)
+
+
+@receiver(post_delete, sender=Customer)
+def count_deleted_customer(sender, instance, **kwargs):
+    counters.increment(Counter.CUSTOMERS, -1)
+
+
+@receiver(post_delete, sender=Order)
+def count_deleted_order(sender, instance, **kwargs):
+    counters.increment(Counter.ORDERS, -1)
+    counters.increment(Counter.REVENUE, -instance.total_amount)
+
+
+# Rollups of days older than crm.rollups.RECENT_DAYS are recomputed only
+# when flagged. bulkCreateOrders flags its own dates.
+@receiver(post_save, sender=Order)
+def flag_rollups_for_saved_order(sender, instance, created, **kwargs):
+    dates = {rollups.day_of(instance.order_date)}
+    loaded = getattr(instance, "_loaded_values", {})
+    if loaded.get("order_date") is not None:
+        dates.add(rollups.day_of(loaded["order_date"]))
+    rollups.mark_stale(dates)
+
+
+@receiver(post_delete, sender=Order)
+def flag_rollups_for_deleted_order(sender, instance, **kwargs):
+    rollups.mark_stale({rollups.day_of(instance.order_date)})
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def flag_rollups_for_customer(sender, instance, created=True, **kwargs):
+    # post_delete sends no ``created``; a delete always changes its day.
+    if created:
+        rollups.mark_stale({rollups.day_of(instance.created_at)})
+
+
+@receiver(post_save, sender=Order)
+def record_customer_activity(sender, instance, created, **kwargs):
+    if created:
+        Customer.touch({instance.customer_id: instance.order_date})
+        invalidate_model(Customer)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply ``SQLITE_PRAGMAS`` (WAL, busy timeout, cache sizes, ...) to each new SQLite connection."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+            cursor.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,62 @@
+"""Count the SQL a block of code runs, via ``connection.execute_wrapper``.
+
+Unlike ``CaptureQueriesContext`` this works with ``DEBUG = False`` and also
+counts the rows each query hands back to Django, which is what N+1 fixes
+and over-fetching show up in.
+"""
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_FETCHES = (
+    ("fetchone", lambda row: row is not None),
+    ("fetchmany", len),
+    ("fetchall", len),
+)
+
+
+class QueryRecorder:
+    """``with QueryRecorder() as sql: ...`` then read ``sql.queries``, ``sql.rows`` and ``sql.duration``."""
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.connection = connections[using]
+        self.queries = 0
+        self.rows = 0
+        self.duration = 0.0
+        self.active = False
+
+    def __enter__(self):
+        self._wrapper = self.connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        self.active = True
+        return self
+
+    def __exit__(self, *exc_info):
+        self.active = False
+        self._wrapper.__exit__(*exc_info)
+
+    def __call__(self, execute, sql, params, many, context):
+        self._count_rows(context["cursor"])
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.queries += 1
+
+    def _count_rows(self, cursor):
+        # Rows are read after execute() returns, through the same CursorWrapper,
+        # so its fetch methods are wrapped (once per cursor) to count them.
+        if getattr(cursor, "_query_recorder", None) is self:
+            return
+        cursor._query_recorder = self
+        for name, size in _FETCHES:
+            fetch = getattr(cursor, name)
+
+            def counting(*args, _fetch=fetch, _size=size):
+                result = _fetch(*args)
+                if self.active:
+                    self.rows += _size(result)
+                return result
+
+            setattr(cursor, name, counting)
@@ -1,38 +1,55 @@
 from datetime import datetime
-import requests
 from celery import shared_task
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
+
+from crm.graphql_client import execute
+from crm.metrics import track_job
+from crm.rollups import refresh_recent
 
 @shared_task
 def generate_crm_report():
     """Generate a weekly CRM report using GraphQL data."""
 
-    transport = RequestsHTTPTransport(
-        url="http://localhost:8000/graphql",
-        verify=False,
-        retries=3,
-    )
-    client = Client(transport=transport, fetch_schema_from_transport=True)
-
-    query = gql("""
+    query = """
         query {
             totalCustomers
             totalOrders
             totalRevenue
+            salesReport {
+                orders
+                revenue
+                newCustomers
+                topProducts(limit: 3) { units product { name } }
+            }
         }
-    """)
+    """
 
     try:
-        result = client.execute(query)
+        with track_job("generate_crm_report") as run:
+            result = execute(query)
+            # Rows summarised: the orders of the reported week.
+            run.rows = result["salesReport"]["orders"]
         customers = result.get("totalCustomers", 0)
         orders = result.get("totalOrders", 0)
         revenue = result.get("totalRevenue", 0)
+        week = result["salesReport"]
+        top = ", ".join(f"{p['product']['name']} ({p['units']})" for p in week["topProducts"] if p["product"])
 
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         with open("/tmp/crm_report_log.txt", "a") as log:
             log.write(f"{timestamp} - Report: {customers} customers, {orders} orders, {revenue} revenue\n")
+            log.write(
+                f"{timestamp} - Last 7 days: {week['orders']} orders, {week['revenue']} revenue, "
+                f"{week['newCustomers']} new customers; top products: {top or 'none'}\n"
+            )
     except Exception as e:
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         with open("/tmp/crm_report_log.txt", "a") as log:
             log.write(f"{timestamp} - ERROR generating report: {e}\n")
+
+
+@shared_task
+def update_daily_rollups():
+    """Recompute today's and yesterday's DailySalesRollup rows, and any older day flagged stale."""
+    with track_job("update_daily_rollups") as run:
+        run.rows = refresh_recent()
+    return run.rows
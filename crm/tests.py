@@ -1,3 +1,1320 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+import multiprocessing
+import warnings
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.models import Max, Sum
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from graphql_relay import from_global_id
+
+from alx_backend_graphql_crm.schema import schema
+from . import counters
+from .models import Counter, Customer, DailySalesRollup, Product, Order, OrderItem, Watermark
+from .caching import result_cache_stats
+from .cost import CostAnalysis
+from .filters import CustomerFilter, OrderFilter, ProductFilter
+from .graphql_client import CRMClient, GraphQLClientError
+from .loaders import Loaders
+from .management.commands.seed import SEED_EPOCH
+from .metrics import JOB_ROWS, track_job
+from .reminders import send_order_reminders
+from .rollups import refresh_recent
+from .tracing import trace_stats
+from .views import document_cache, query_hash
+
+
+def setUpModule():
+    # Every request, job and forked seed worker records metrics; keep their
+    # per-process files out of the real CRM_METRICS_DIR.
+    global _metrics_dir, _metrics_settings
+    _metrics_dir = tempfile.TemporaryDirectory()
+    _metrics_settings = override_settings(CRM_METRICS_DIR=_metrics_dir.name)
+    _metrics_settings.enable()
+
+
+def tearDownModule():
+    _metrics_settings.disable()
+    _metrics_dir.cleanup()
+
+
+def execute(query, variables=None):
+    request = RequestFactory().post("/graphql")
+    return schema.execute(query, variables=variables, context_value=request)
+
+
+def schema_pk(global_id):
+    return int(from_global_id(global_id)[1])
+
+
+class CRMTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = [
+            Product.objects.create(name=f"Product {i}", price=Decimal("10.00") + i, stock=i)
+            for i in range(5)
+        ]
+        cls.customers = [
+            Customer.objects.create(name=f"Customer {i}", email=f"customer{i}@example.com")
+            for i in range(5)
+        ]
+        for i in range(20):
+            order = Order.objects.create(customer=cls.customers[i % 5], total_amount=Decimal("0.00"))
+            order.products.set(cls.products[: (i % 3) + 1])
+
+    def setUp(self):
+        # Cached results and model versions outlive each test's rollback.
+        cache.clear()
+        result_cache_stats.clear()
+
+
+class DataLoaderTests(CRMTestCase):
+    ALL_ORDERS = """
+        query ($first: Int) {
+            allOrders(first: $first) {
+                edges {
+                    node {
+                        id
+                        customer { name }
+                        products { edges { node { name price } } }
+                    }
+                }
+            }
+        }
+    """
+
+    def test_all_orders_query_count_is_constant(self):
+        # COUNT(*), the page joined to customers, products by order.
+        for first in (5, 20):
+            with self.assertNumQueries(3):
+                result = execute(self.ALL_ORDERS, {"first": first})
+            self.assertIsNone(result.errors)
+            self.assertEqual(len(result.data["allOrders"]["edges"]), first)
+
+    def test_all_orders_resolves_relations(self):
+        result = execute(self.ALL_ORDERS, {"first": 20})
+        self.assertIsNone(result.errors)
+        expected = {
+            order.pk: (order.customer.name, [p.name for p in order.products.order_by("pk")])
+            for order in Order.objects.all()
+        }
+        for edge in result.data["allOrders"]["edges"]:
+            node = edge["node"]
+            order = Order.objects.get(pk=schema_pk(node["id"]))
+            name, products = expected[order.pk]
+            self.assertEqual(node["customer"]["name"], name)
+            self.assertEqual([e["node"]["name"] for e in node["products"]["edges"]], products)
+
+    def test_customer_orders_are_batched(self):
+        query = """
+            {
+                allCustomers(first: 5) {
+                    edges { node { orders { edges { node { id products { edges { node { name } } } } } } } }
+                }
+            }
+        """
+        # COUNT(*), the page, orders by customer, products by order.
+        with self.assertNumQueries(4):
+            result = execute(query)
+        self.assertIsNone(result.errors)
+        counts = [len(e["node"]["orders"]["edges"]) for e in result.data["allCustomers"]["edges"]]
+        self.assertEqual(counts, [4] * 5)
+
+    def test_nested_filter_arguments_still_apply(self):
+        query = """
+            {
+                allOrders(first: 20) {
+                    edges { node { products(name: "Product 0") { edges { node { name } } } } }
+                }
+            }
+        """
+        # COUNT(*), the page, products by order, one filter over every order's products.
+        with self.assertNumQueries(4):
+            result = execute(query)
+        self.assertIsNone(result.errors)
+        for edge in result.data["allOrders"]["edges"]:
+            names = [e["node"]["name"] for e in edge["node"]["products"]["edges"]]
+            self.assertEqual(names, ["Product 0"])
+
+
+class QueryOptimizerTests(CRMTestCase):
+    def test_nested_lists_become_a_prefetch_tree(self):
+        query = """
+            {
+                orders {
+                    id
+                    customer { name orders { edges { node { id products { edges { node { name } } } } } } }
+                }
+            }
+        """
+        # Orders joined to customers, customers' orders, their products.
+        with self.assertNumQueries(3):
+            result = execute(query)
+        self.assertIsNone(result.errors)
+        self.assertEqual(len(result.data["orders"]), 20)
+        for order in result.data["orders"]:
+            self.assertEqual(len(order["customer"]["orders"]["edges"]), 4)
+
+    def test_only_selected_columns_are_loaded(self):
+        with self.assertNumQueries(1) as ctx:
+            result = execute("{ products(priceGte: 12) { name } }")
+        self.assertIsNone(result.errors)
+        self.assertEqual(len(result.data["products"]), 3)
+        sql = ctx.captured_queries[0]["sql"]
+        self.assertIn('"crm_product"."name"', sql)
+        self.assertNotIn('"crm_product"."stock"', sql)
+
+    def test_annotations_are_applied_for_selected_fields(self):
+        query = "{ allCustomers(first: 5) { edges { node { name orderCount } } } }"
+        with self.assertNumQueries(2):
+            result = execute(query)
+        self.assertIsNone(result.errors)
+        counts = [e["node"]["orderCount"] for e in result.data["allCustomers"]["edges"]]
+        self.assertEqual(counts, [4] * 5)
+
+    def test_fragments_are_followed(self):
+        query = """
+            query { customers { ...CustomerFields } }
+            fragment CustomerFields on CustomerType { email orders { edges { node { totalAmount } } } }
+        """
+        with self.assertNumQueries(2):
+            result = execute(query)
+        self.assertIsNone(result.errors)
+        self.assertEqual(len(result.data["customers"]), 5)
+
+    def test_orders_product_name_filter(self):
+        result = execute('{ orders(productName: "Product 2") { id } }')
+        self.assertIsNone(result.errors)
+        self.assertEqual(len(result.data["orders"]), Order.objects.filter(products=self.products[2]).count())
+
+
+class KeysetPaginationTests(CRMTestCase):
+    QUERY = """
+        query ($first: Int, $after: String, $last: Int, $before: String, $orderBy: String, $minTotal: Decimal) {
+            allOrdersKeyset(first: $first, after: $after, last: $last, before: $before,
+                            orderBy: $orderBy, totalAmount_Gte: $minTotal) {
+                edges { cursor node { id totalAmount } }
+                pageInfo { hasNextPage hasPreviousPage endCursor startCursor }
+            }
+        }
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for i, order in enumerate(Order.objects.order_by("pk")):
+            order.total_amount = Decimal(i % 4)
+            order.save()
+
+    def walk(self, **variables):
+        ids, after = [], None
+        while True:
+            result = execute(self.QUERY, {**variables, "first": 3, "after": after})
+            self.assertIsNone(result.errors)
+            page = result.data["allOrdersKeyset"]
+            ids += [schema_pk(e["node"]["id"]) for e in page["edges"]]
+            if not page["pageInfo"]["hasNextPage"]:
+                return ids
+            after = page["pageInfo"]["endCursor"]
+
+    def test_walks_every_row_once_in_sort_order(self):
+        ids = self.walk(orderBy="-total_amount")
+        expected = list(Order.objects.order_by("-total_amount", "-pk").values_list("pk", flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_datetime_sort_key_with_ties(self):
+        ids = self.walk(orderBy="-order_date")
+        expected = list(Order.objects.order_by("-order_date", "-pk").values_list("pk", flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_datetime_sort_key_within_one_millisecond(self):
+        start = timezone.now() - timedelta(days=1)
+        for i in range(6):
+            Order.objects.create(
+                customer=self.customers[0], total_amount=Decimal("1.00"), order_date=start + timedelta(microseconds=100 * i),
+            )
+        for order_by, pk in (("order_date", "pk"), ("-order_date", "-pk")):
+            ids = self.walk(orderBy=order_by)
+            self.assertEqual(ids, list(Order.objects.order_by(order_by, pk).values_list("pk", flat=True)))
+
+    def test_filters_still_apply(self):
+        ids = self.walk(orderBy="total_amount", minTotal="2")
+        expected = list(
+            Order.objects.filter(total_amount__gte=2).order_by("total_amount", "pk").values_list("pk", flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_backward_pagination(self):
+        first = execute(self.QUERY, {"first": 6, "orderBy": "total_amount"}).data["allOrdersKeyset"]
+        before = first["edges"][5]["cursor"]
+        result = execute(self.QUERY, {"last": 2, "before": before, "orderBy": "total_amount"})
+        self.assertIsNone(result.errors)
+        page = result.data["allOrdersKeyset"]
+        self.assertEqual(
+            [e["node"]["id"] for e in page["edges"]],
+            [e["node"]["id"] for e in first["edges"][3:5]],
+        )
+        self.assertTrue(page["pageInfo"]["hasPreviousPage"])
+
+    def test_total_count_only_when_selected(self):
+        with self.assertNumQueries(1):
+            execute("{ allProductsKeyset(first: 2) { edges { node { name } } } }")
+        with self.assertNumQueries(2):
+            result = execute("{ allProductsKeyset(first: 2, price_Gte: 12) { totalCount } }")
+        self.assertEqual(result.data["allProductsKeyset"]["totalCount"], 3)
+
+    def test_rejects_cursor_for_another_sort_key(self):
+        page = execute(self.QUERY, {"first": 1, "orderBy": "total_amount"}).data["allOrdersKeyset"]
+        result = execute(self.QUERY, {"first": 1, "orderBy": "order_date", "after": page["pageInfo"]["endCursor"]})
+        self.assertIsNotNone(result.errors)
+
+    def test_rejects_unknown_sort_field(self):
+        result = execute("{ allCustomersKeyset(first: 1, orderBy: \"phone\") { edges { node { id } } } }")
+        self.assertIsNotNone(result.errors)
+
+
+class DocumentCacheTests(CRMTestCase):
+    def setUp(self):
+        super().setUp()
+        document_cache.clear()
+
+    def post(self, body):
+        return self.client.post("/graphql", json.dumps(body), content_type="application/json")
+
+    def test_documents_are_parsed_and_validated_once(self):
+        for _ in range(3):
+            response = self.post({"query": "{ hello }"})
+            self.assertEqual(response.json()["data"], {"hello": "Hello, GraphQL!"})
+        stats = document_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+
+    def test_invalid_documents_are_cached_with_their_errors(self):
+        for _ in range(2):
+            response = self.post({"query": "{ nope }"})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("nope", response.json()["errors"][0]["message"])
+        self.assertEqual(document_cache.stats()["hits"], 1)
+
+    def test_automatic_persisted_queries(self):
+        query = "{ hello }"
+        extensions = {"persistedQuery": {"version": 1, "sha256Hash": query_hash(query)}}
+
+        response = self.post({"extensions": extensions})
+        self.assertEqual(response.json()["errors"][0]["message"], "PersistedQueryNotFound")
+
+        response = self.post({"query": query, "extensions": extensions})
+        self.assertEqual(response.json()["data"], {"hello": "Hello, GraphQL!"})
+
+        response = self.client.get("/graphql", {"extensions": json.dumps(extensions)}, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.json()["data"], {"hello": "Hello, GraphQL!"})
+
+    def test_persisted_query_hash_must_match(self):
+        extensions = {"persistedQuery": {"version": 1, "sha256Hash": "0" * 64}}
+        response = self.post({"query": "{ hello }", "extensions": extensions})
+        self.assertEqual(response.status_code, 400)
+
+    def test_stats_endpoint(self):
+        self.post({"query": "{ hello }"})
+        stats = self.client.get("/graphql/cache-stats").json()
+        self.assertEqual(stats["documents"]["misses"], 1)
+        self.assertIn("hits", stats["persisted_queries"])
+
+
+class QueryCostTests(CRMTestCase):
+    def post(self, query, variables=None):
+        body = {"query": query, "variables": variables or {}}
+        return self.client.post("/graphql", json.dumps(body), content_type="application/json")
+
+    def cost(self, query, variables=None):
+        from graphql import parse
+
+        document = parse(query)
+        return CostAnalysis(schema.graphql_schema, document, variables).operation(document.definitions[0])
+
+    def test_connections_multiply_by_first(self):
+        query = """
+            query ($n: Int) {
+                allOrders(first: $n) {
+                    edges { node { id customer { name } products(first: 5) { edges { node { name } } } } }
+                }
+            }
+        """
+        # allOrders(1) + n * (node(1) + customer(1) + products(1 + 5 * node(1)))
+        self.assertEqual(self.cost(query, {"n": 10}), (81, 2))
+        self.assertEqual(self.cost(query, {"n": 50}), (401, 2))
+
+    def test_fragments_are_costed(self):
+        query = """
+            query { customers { ...C } }
+            fragment C on CustomerType { orders(first: 2) { edges { node { id } } } }
+        """
+        self.assertEqual(self.cost(query), (1 + 100 * (1 + 2 * 1), 2))
+
+    def test_cost_is_returned_in_extensions(self):
+        response = self.post("{ allProducts(first: 3) { edges { node { name } } } }")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["extensions"]["cost"]["cost"], 1 + 3)
+
+    def test_nested_connections_charge_their_rows(self):
+        query = """
+            {
+                allCustomers(first: 99) { edges { node {
+                    orders(first: 99) { edges { node {
+                        products(first: 99) { edges { node { name } } }
+                    } } }
+                } } }
+            }
+        """
+        # Up to 99 * 99 * 99 products: 1 + 99 * (node + orders(1 + 99 * (node + products(1 + 99 * node)))).
+        self.assertEqual(self.cost(query)[0], 990_100)
+        with self.assertNumQueries(0):
+            response = self.post(query)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"][0]["extensions"]["code"], "QUERY_TOO_EXPENSIVE")
+
+    def test_fan_out_is_rejected_before_resolving(self):
+        query = """
+            {
+                allCustomers {
+                    edges { node { orders { edges { node { customer {
+                        orders { edges { node { products { edges { node { name } } } } } }
+                    } } } } } }
+                }
+            }
+        """
+        with self.assertNumQueries(0):
+            response = self.post(query)
+        body = response.json()
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn("data", body)
+        self.assertEqual(body["errors"][0]["extensions"]["code"], "QUERY_TOO_EXPENSIVE")
+        self.assertGreater(body["extensions"]["cost"]["cost"], body["extensions"]["cost"]["maxCost"])
+
+    def test_depth_limit(self):
+        selection = "id"
+        for _ in range(5):
+            selection = f"customer {{ orders {{ edges {{ node {{ {selection} }} }} }} }}"
+        query = f"{{ orders {{ {selection} }} }}"
+        with self.settings(GRAPHQL_MAX_QUERY_COST=10**20):
+            response = self.post(query)
+        codes = [e["extensions"]["code"] for e in response.json()["errors"]]
+        self.assertEqual(codes, ["QUERY_TOO_DEEP"])
+
+
+class ResultCacheTests(CRMTestCase):
+    PRODUCTS = "query ($min: Float) { products(priceGte: $min) { name stock } }"
+
+    def test_repeated_reads_are_served_from_cache(self):
+        first = execute(self.PRODUCTS, {"min": 11})
+        with self.assertNumQueries(0):
+            second = execute(self.PRODUCTS, {"min": 11})
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(result_cache_stats.stats()["Query.products"], {"hits": 1, "misses": 1, "hit_ratio": 0.5})
+
+    def test_variables_are_part_of_the_key(self):
+        execute(self.PRODUCTS, {"min": 11})
+        result = execute(self.PRODUCTS, {"min": 13})
+        self.assertEqual(len(result.data["products"]), 2)
+
+    def test_writes_invalidate(self):
+        execute(self.PRODUCTS, {"min": 11})
+        Product.objects.filter(pk=self.products[4].pk).update(stock=0)  # no signal: still cached
+        self.assertEqual(execute(self.PRODUCTS, {"min": 11}).data["products"][-1]["stock"], 4)
+        product = self.products[4]
+        product.stock = 0
+        product.save()
+        self.assertEqual(execute(self.PRODUCTS, {"min": 11}).data["products"][-1]["stock"], 0)
+
+    def test_m2m_changes_invalidate_nested_results(self):
+        query = "{ customers { orders { edges { node { products { edges { node { name } } } } } } } }"
+        execute(query)
+        with self.assertNumQueries(0):
+            execute(query)
+        Order.objects.first().products.clear()
+        with self.assertNumQueries(3):
+            execute(query)
+
+    def test_connection_pages_are_cached(self):
+        query = "{ allProducts(first: 2) { edges { cursor node { name } } pageInfo { hasNextPage } } }"
+        first = execute(query)
+        with self.assertNumQueries(0):
+            second = execute(query)
+        self.assertEqual(first.data, second.data)
+        self.assertTrue(second.data["allProducts"]["pageInfo"]["hasNextPage"])
+
+    def test_cache_control_directive(self):
+        query = "{ products @cacheControl(maxAge: 0) { name } }"
+        execute(query)
+        with self.assertNumQueries(1):
+            execute(query)
+        self.assertNotIn("Query.products", result_cache_stats.stats())
+
+
+class ResultCacheCommitTests(TransactionTestCase):
+    PRODUCTS = ResultCacheTests.PRODUCTS
+
+    def setUp(self):
+        cache.clear()
+
+    def test_results_cached_before_commit_are_not_reused(self):
+        product = Product.objects.create(name="Widget", price=Decimal("20.00"), stock=3)
+        with transaction.atomic():
+            product.stock = 99
+            product.save()
+            # Until the commit, a concurrent request still reads the old
+            # stock and caches it under the version the save just bumped.
+            Product.objects.filter(pk=product.pk).update(stock=3)
+            stale = execute(self.PRODUCTS, {"min": 20})
+            self.assertEqual(stale.data["products"][0]["stock"], 3)
+            Product.objects.filter(pk=product.pk).update(stock=99)
+        self.assertEqual(execute(self.PRODUCTS, {"min": 20}).data["products"][0]["stock"], 99)
+
+
+class AsyncExecutionTests(CRMTestCase):
+    async def post(self, query, variables=None):
+        body = json.dumps({"query": query, "variables": variables or {}})
+        return await self.async_client.post("/graphql/async", body, content_type="application/json")
+
+    async def test_query_matches_sync_view(self):
+        query = """
+            {
+                hello
+                orders(totalAmountGte: 0) { id customer { name } products(first: 5) { edges { node { name } } } }
+                allProducts(first: 2) { edges { node { name } } }
+                customers { orderCount }
+            }
+        """
+        response = await self.post(query)
+        sync_response = await sync_to_async(self.client.post)(
+            "/graphql", json.dumps({"query": query}), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("errors", response.json())
+        self.assertEqual(response.json()["data"], sync_response.json()["data"])
+
+    def test_loaders_batch_under_the_async_executor(self):
+        query = "{ allCustomers(first: 5) { edges { node { orders { edges { node { id } } } } } } }"
+        with self.assertNumQueries(3):
+            response = async_to_sync(self.post)(query)
+        counts = [len(e["node"]["orders"]["edges"]) for e in response.json()["data"]["allCustomers"]["edges"]]
+        self.assertEqual(counts, [4] * 5)
+
+    async def test_mutations_run_in_a_thread(self):
+        query = 'mutation { createCustomer(input: {name: "Async", email: "async@example.com"}) { customer { name } } }'
+        response = await self.post(query)
+        self.assertEqual(response.json()["data"]["createCustomer"]["customer"]["name"], "Async")
+        self.assertTrue(await Customer.objects.filter(email="async@example.com").aexists())
+
+
+class CounterTests(CRMTestCase):
+    TOTALS = "{ totalCustomers totalOrders totalRevenue }"
+
+    def setUp(self):
+        super().setUp()
+        call_command("rebuild_counters", stdout=StringIO())
+
+    def totals(self):
+        with self.assertNumQueries(3):
+            return execute(self.TOTALS).data
+
+    def test_totals_are_primary_key_lookups(self):
+        revenue = Order.objects.aggregate(total=Sum("total_amount"))["total"]
+        self.assertEqual(self.totals(), {"totalCustomers": 5, "totalOrders": 20, "totalRevenue": str(revenue)})
+
+    def test_mutations_and_deletes_keep_counters_in_step(self):
+        execute('mutation { createCustomer(input: {name: "A", email: "a@example.com"}) { customer { id } } }')
+        execute('mutation { bulkCreateCustomers(input: [{name: "B", email: "b@example.com"}, {name: "C", email: "c@example.com"}]) { errors } }')
+        customer_id = self.customers[0].pk
+        product_ids = [p.pk for p in self.products[:2]]
+        execute(
+            "mutation ($c: ID!, $p: [ID]!) { createOrder(input: {customerId: $c, productIds: $p}) { order { id } } }",
+            {"c": customer_id, "p": product_ids},
+        )
+        self.customers[1].delete()  # cascades to its 4 orders
+
+        self.assertEqual(self.stored(), counters.actual_totals())
+        self.assertEqual(self.totals()["totalCustomers"], 7)
+
+    def test_orm_writes_keep_counters_in_step(self):
+        customer = Customer.objects.create(name="Shell", email="shell@example.com")
+        order = Order.objects.create(customer=customer, total_amount=Decimal("5.00"))
+        order.total_amount = Decimal("7.50")
+        order.save()
+        Product.objects.filter(pk=self.products[0].pk).update(price=Decimal("1.00"))
+        Order.objects.create(customer=customer, total_amount=Decimal("1.00")).calculate_total()
+        self.assertEqual(self.stored(), counters.actual_totals())
+
+    def test_deletes_update_each_counter_once(self):
+        Order.objects.update(total_amount=Decimal("2.00"))
+        call_command("rebuild_counters", stdout=StringIO())
+        customers = Customer.objects.filter(pk__in=[c.pk for c in self.customers[:3]])
+        with CaptureQueriesContext(connection) as ctx:
+            customers.delete()  # cascades to 12 orders and their lines
+        counter_updates = [q for q in ctx.captured_queries if 'UPDATE "crm_counter"' in q["sql"]]
+        self.assertEqual(len(counter_updates), 3)
+        self.assertEqual(self.stored(), counters.actual_totals())
+
+    def stored(self):
+        return {name: counters.read(name) for name in (Counter.CUSTOMERS, Counter.ORDERS, Counter.REVENUE)}
+
+    def test_rebuild_reports_and_fixes_drift(self):
+        Counter.objects.filter(name=Counter.ORDERS).update(value=0)
+        out = StringIO()
+        call_command("rebuild_counters", "--check", stdout=out)
+        self.assertIn("stored 0.00, actual 20 (would fix)", out.getvalue())
+        self.assertEqual(counters.read(Counter.ORDERS), 0)
+        call_command("rebuild_counters", stdout=StringIO())
+        self.assertEqual(counters.read(Counter.ORDERS), 20)
+
+
+class BulkCreateCustomersTests(CRMTestCase):
+    MUTATION = """
+        mutation ($input: [CustomerInput]!, $batchSize: Int) {
+            bulkCreateCustomers(input: $input, batchSize: $batchSize) {
+                customers { email }
+                errors
+                rowErrors { index message }
+            }
+        }
+    """
+
+    def rows(self, count, start=0):
+        return [{"name": f"Bulk {i}", "email": f"bulk{i}@example.com"} for i in range(start, start + count)]
+
+    def test_reports_row_errors_by_index(self):
+        rows = self.rows(3) + [
+            {"name": "Dup", "email": "bulk0@example.com"},
+            {"name": "Taken", "email": "customer0@example.com"},
+            {"name": "Phone", "email": "phone@example.com", "phone": "abc"},
+        ]
+        result = execute(self.MUTATION, {"input": rows})
+        self.assertIsNone(result.errors)
+        data = result.data["bulkCreateCustomers"]
+        self.assertEqual([c["email"] for c in data["customers"]], [r["email"] for r in rows[:3]])
+        self.assertEqual([e["index"] for e in data["rowErrors"]], [3, 4, 5])
+        self.assertEqual(data["errors"][1], "Row 4: Email already exists: customer0@example.com")
+        self.assertEqual(Customer.objects.filter(email__startswith="bulk").count(), 3)
+
+    def test_invalid_row_does_not_claim_its_email(self):
+        rows = [
+            {"name": "Bad phone", "email": "retry@example.com", "phone": "abc"},
+            {"name": "Fixed", "email": "retry@example.com", "phone": "+1234567890"},
+        ]
+        data = execute(self.MUTATION, {"input": rows}).data["bulkCreateCustomers"]
+        self.assertEqual([c["email"] for c in data["customers"]], ["retry@example.com"])
+        self.assertEqual([e["index"] for e in data["rowErrors"]], [0])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def queries(rows):
+            with CaptureQueriesContext(connection) as ctx:
+                result = execute(self.MUTATION, {"input": rows})
+            self.assertIsNone(result.errors)
+            return len(ctx.captured_queries)
+
+        # Stay under one SQLite INSERT (999 parameters / 5 columns).
+        self.assertEqual(queries(self.rows(50)), queries(self.rows(190, start=50)))
+
+    def test_chunks_by_batch_size(self):
+        with CaptureQueriesContext(connection) as ctx:
+            execute(self.MUTATION, {"input": self.rows(25), "batchSize": 10})
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith('INSERT INTO "crm_customer"')]
+        probes = [q for q in ctx.captured_queries if q["sql"].startswith('SELECT "crm_customer"."email"')]
+        self.assertEqual((len(inserts), len(probes)), (3, 3))
+
+
+class CreateOrderTests(CRMTestCase):
+    MUTATION = """
+        mutation ($input: OrderInput!) {
+            createOrder(input: $input) {
+                order { totalAmount items { quantity product { name } } }
+                errors
+            }
+        }
+    """
+
+    def create(self, items, product_ids=None):
+        variables = {"input": {
+            "customerId": str(self.customers[0].pk),
+            "items": [{"productId": str(p.pk), "quantity": q} for p, q in items],
+            "productIds": [str(p.pk) for p in product_ids or []],
+        }}
+        result = execute(self.MUTATION, variables)
+        self.assertIsNone(result.errors)
+        return result.data["createOrder"]
+
+    def stock(self):
+        return list(Product.objects.order_by("pk").values_list("stock", flat=True))
+
+    def test_quantities_set_total_and_take_stock(self):
+        p = self.products
+        data = self.create([(p[3], 2), (p[4], 1)], product_ids=[p[4]])
+        self.assertIsNone(data["errors"])
+        # 2 x 13.00 + (1 + 1) x 14.00
+        self.assertEqual(Decimal(data["order"]["totalAmount"]), Decimal("54.00"))
+        self.assertEqual(
+            sorted((i["product"]["name"], i["quantity"]) for i in data["order"]["items"]),
+            [("Product 3", 2), ("Product 4", 2)],
+        )
+        self.assertEqual(self.stock(), [0, 1, 2, 1, 2])
+
+    def test_oversell_is_rejected_and_rolled_back(self):
+        orders = Order.objects.count()
+        data = self.create([(self.products[1], 1), (self.products[2], 3)])
+        self.assertIsNone(data["order"])
+        self.assertEqual(data["errors"], [f"Insufficient stock for product {self.products[2].pk}: requested 3"])
+        self.assertEqual(self.stock(), [0, 1, 2, 3, 4])
+        self.assertEqual(Order.objects.count(), orders)
+
+    def test_invalid_quantity(self):
+        data = self.create([(self.products[1], 0)])
+        self.assertIn(f"Quantity must be positive for product {self.products[1].pk}", data["errors"])
+
+    def test_query_count_does_not_grow_with_products(self):
+        def queries(items):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertIsNone(self.create(items)["errors"])
+            return len([q for q in ctx.captured_queries if "SAVEPOINT" not in q["sql"]])
+
+        self.assertEqual(queries([(self.products[4], 1)]), queries([(p, 1) for p in self.products[1:]]))
+
+
+class UpdateLowStockProductsTests(CRMTestCase):
+    MUTATION = """
+        mutation ($threshold: Int, $amount: Int, $batchSize: Int) {
+            updateLowStockProducts(threshold: $threshold, amount: $amount, batchSize: $batchSize) {
+                updatedIds
+                count
+            }
+        }
+    """
+
+    def stock(self):
+        return list(Product.objects.order_by("pk").values_list("stock", flat=True))
+
+    def test_restocks_below_threshold_with_reorder_point_override(self):
+        Product.objects.filter(pk=self.products[4].pk).update(reorder_point=5)
+        result = execute(self.MUTATION, {"threshold": 2, "amount": 7})
+        self.assertIsNone(result.errors)
+        data = result.data["updateLowStockProducts"]
+        expected = [self.products[i].pk for i in (0, 1, 4)]
+        self.assertEqual((sorted(map(int, data["updatedIds"])), data["count"]), (expected, 3))
+        self.assertEqual(self.stock(), [7, 8, 2, 3, 11])
+
+    def test_updates_in_id_range_chunks_without_loading_products(self):
+        with CaptureQueriesContext(connection) as ctx:
+            execute(self.MUTATION, {"batchSize": 2})
+        sql = [q["sql"] for q in ctx.captured_queries]
+        self.assertEqual(len([q for q in sql if q.startswith("UPDATE")]), 3)
+        self.assertFalse([q for q in sql if q.startswith('SELECT "crm_product"."id", "crm_product"."name"')])
+        self.assertEqual(self.stock(), [10, 11, 12, 13, 14])
+
+    def test_products_are_fetched_only_when_selected(self):
+        result = execute("""
+            mutation { updateLowStockProducts(threshold: 2) { updatedProducts { name stock } } }
+        """)
+        self.assertIsNone(result.errors)
+        self.assertEqual(
+            result.data["updateLowStockProducts"]["updatedProducts"],
+            [{"name": "Product 0", "stock": 10}, {"name": "Product 1", "stock": 11}],
+        )
+
+
+class BulkCreateOrdersTests(CRMTestCase):
+    MUTATION = """
+        mutation ($input: [OrderInput!]!, $allOrNothing: Boolean) {
+            bulkCreateOrders(input: $input, allOrNothing: $allOrNothing) {
+                orders { totalAmount items { quantity } }
+                errors
+                rowErrors { index }
+            }
+        }
+    """
+
+    def row(self, customer, *items):
+        return {
+            "customerId": str(customer.pk),
+            "items": [{"productId": str(p.pk), "quantity": q} for p, q in items],
+        }
+
+    def run_bulk(self, rows, **variables):
+        result = execute(self.MUTATION, {"input": rows, **variables})
+        self.assertIsNone(result.errors)
+        return result.data["bulkCreateOrders"]
+
+    def test_partial_success_reports_rows(self):
+        c, p = self.customers, self.products
+        orders, counted = Order.objects.count(), counters.read(Counter.ORDERS)
+        data = self.run_bulk([
+            self.row(c[0], (p[4], 2), (p[3], 1)),
+            {"customerId": "999999", "productIds": [str(p[1].pk)]},
+            self.row(c[1], (p[4], 3)),  # only 2 left after row 0
+            self.row(c[2], (p[2], 2)),
+        ])
+        self.assertEqual([o["totalAmount"] for o in data["orders"]], ["41.00", "24.00"])
+        self.assertEqual([e["index"] for e in data["rowErrors"]], [1, 2])
+        self.assertEqual(data["errors"][0], "Row 1: Invalid customer ID: 999999")
+        self.assertEqual(Order.objects.count(), orders + 2)
+        self.assertEqual(list(Product.objects.order_by("pk").values_list("stock", flat=True)), [0, 1, 0, 2, 2])
+        self.assertEqual(counters.read(Counter.ORDERS), counted + 2)
+
+    def test_all_or_nothing(self):
+        orders = Order.objects.count()
+        data = self.run_bulk(
+            [self.row(self.customers[0], (self.products[4], 1)), self.row(self.customers[0], (self.products[0], 1))],
+            allOrNothing=True,
+        )
+        self.assertEqual((data["orders"], [e["index"] for e in data["rowErrors"]]), ([], [1]))
+        self.assertEqual(Order.objects.count(), orders)
+        self.assertEqual(Product.objects.get(pk=self.products[4].pk).stock, 4)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def queries(count):
+            rows = [self.row(self.customers[i % 5], (self.products[4], 1)) for i in range(count)]
+            Product.objects.update(stock=1000)
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.run_bulk(rows)["errors"], [])
+            return len([q for q in ctx.captured_queries if "SAVEPOINT" not in q["sql"]])
+
+        self.assertEqual(queries(2), queries(60))
+
+
+class ImportCRMTests(CRMTestCase):
+    def write(self, text):
+        f = tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False)
+        self.addCleanup(os.unlink, f.name)
+        with f:
+            f.write(text)
+        return f.name
+
+    def run_import(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command("import_crm", *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_upserts_products_and_customers(self):
+        products = self.write("name,price,stock\nProduct 0,99.50,7\nWidget,5,1\nBroken,-1,0\n")
+        customers = self.write(
+            json.dumps({"name": "Renamed", "email": "customer0@example.com"}) + "\n"
+            + json.dumps({"name": "New", "email": "new@example.com", "phone": "+1 555 1234"}) + "\n"
+            + json.dumps({"name": "Bad", "email": "bad@example.com", "phone": "nope"}) + "\n"
+        )
+        before = counters.read(Counter.CUSTOMERS)
+        out, err = self.run_import("--products", products, "--customers", customers, "--batch-size", "2")
+
+        self.assertIn("products: 1 created, 1 updated, 1 rejected", out)
+        self.assertIn("customers: 1 created, 1 updated, 1 rejected", out)
+        self.assertIn("Price must be positive.", err)
+        self.assertIn("Invalid phone format: nope", err)
+        self.assertEqual(Product.objects.get(name="Product 0").price, Decimal("99.50"))
+        self.assertEqual(Customer.objects.get(email="customer0@example.com").name, "Renamed")
+        self.assertEqual(counters.read(Counter.CUSTOMERS), before + 1)
+
+    def test_resumes_from_byte_offset(self):
+        path = self.write("name,price,stock\nFirst,1,1\nSecond,2,2\n")
+        out, _ = self.run_import("--products", path, "--batch-size", "1")
+        offset = out.splitlines()[0].rsplit(" ", 1)[1].rstrip(")")
+        Product.objects.filter(name__in=["First", "Second"]).delete()
+
+        self.run_import("--products", path, "--products-offset", offset)
+        self.assertEqual(list(Product.objects.filter(name__in=["First", "Second"]).values_list("name", flat=True)), ["Second"])
+
+
+class OrderExportTests(CRMTestCase):
+    def get(self, **params):
+        response = self.client.get("/orders/export", params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_flattens_products(self):
+        lines = self.get().splitlines()
+        self.assertEqual(lines[0], "id,order_date,customer_id,customer_name,customer_email,total_amount,products")
+        self.assertEqual(len(lines), 21)
+        first = Order.objects.order_by("pk").first()
+        self.assertTrue(lines[1].startswith(f"{first.pk},"))
+        self.assertTrue(lines[1].endswith(",Customer 0,customer0@example.com,0.00,Product 0"))
+
+    def test_ndjson_with_filters(self):
+        rows = [json.loads(line) for line in self.get(format="ndjson", product_name="product 2").splitlines()]
+        # Orders i % 3 == 2 contain Product 0-2.
+        self.assertEqual(len(rows), 6)
+        self.assertEqual([p["name"] for p in rows[0]["products"]], ["Product 0", "Product 1", "Product 2"])
+
+    def test_queries_per_chunk_not_per_row(self):
+        # The orders query, then one prefetch per chunk of 5.
+        with self.assertNumQueries(1 + 4):
+            self.get(chunk_size=5)
+
+    def test_invalid_filter(self):
+        response = self.client.get("/orders/export", {"total_amount__gte": "lots"})
+        self.assertEqual(response.status_code, 400)
+
+
+class SearchTests(CRMTestCase):
+    QUERY = """
+        query ($term: String!) {
+            search(term: $term) { customers { name email } products { name } }
+        }
+    """
+
+    def search(self, term):
+        result = execute(self.QUERY, {"term": term})
+        self.assertIsNone(result.errors)
+        return result.data["search"]
+
+    def test_prefix_match_on_each_word(self):
+        Customer.objects.create(name="Ada Lovelace", email="ada@engine.org")
+        Customer.objects.create(name="Adam Smith", email="adam@market.org")
+        self.assertEqual([c["name"] for c in self.search("lov ad")["customers"]], ["Ada Lovelace"])
+        self.assertEqual(
+            sorted(c["name"] for c in self.search("ad")["customers"]), ["Ada Lovelace", "Adam Smith"]
+        )
+        self.assertEqual([c["email"] for c in self.search("market")["customers"]], ["adam@market.org"])
+
+    def test_results_are_ranked(self):
+        Product.objects.create(name="Cable adapter", price=1)
+        Product.objects.create(name="Cable cable cable", price=1)
+        self.assertEqual([p["name"] for p in self.search("cable")["products"]][0], "Cable cable cable")
+
+    def test_index_follows_bulk_writes_and_deletes(self):
+        Customer.objects.bulk_create([Customer(name="Zelda Fitzgerald", email="zf@example.com")])
+        self.assertEqual(len(self.search("zel")["customers"]), 1)
+        Customer.objects.filter(email="zf@example.com").update(name="Scott Fitzgerald")
+        self.assertEqual(self.search("zel")["customers"], [])
+        self.assertEqual(len(self.search("scott")["customers"]), 1)
+        Customer.objects.filter(email="zf@example.com").delete()
+        self.assertEqual(self.search("fitz")["customers"], [])
+
+    def test_sync_triggers_survive_migrations(self):
+        # SQLite drops triggers when a migration rebuilds a table.
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_fts_%'")
+            triggers = {row[0] for row in cursor.fetchall()}
+        self.assertEqual(
+            triggers, {f"{t}_fts_{s}" for t in ("crm_customer", "crm_product") for s in ("ai", "ad", "au")}
+        )
+
+    def test_operators_in_the_term_are_plain_text(self):
+        self.assertEqual(self.search('"product" OR NOT -*')["products"], [])
+        self.assertEqual(len(self.search("Product 3")["products"]), 1)
+
+
+class QueryPlanTests(CRMTestCase):
+    """Every indexable filter must be answered by an index, never a full table scan."""
+
+    SAMPLE_VALUES = {
+        "NumberFilter": "10",
+        "DateFilter": "2024-01-01",
+        "LocalDateFilter": "2024-01-01",
+        "DateTimeFilter": "2024-01-01 12:00",
+        "CharFilter": "abc",
+    }
+    # LIKE '%term%' cannot use a b-tree index; these lookups go through search().
+    UNINDEXABLE = ("icontains",)
+
+    def plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_filters_use_indexes(self):
+        checked = 0
+        for filterset_class in (CustomerFilter, ProductFilter, OrderFilter):
+            for name, filter_ in filterset_class.base_filters.items():
+                if filter_.lookup_expr in self.UNINDEXABLE:
+                    continue
+                value = self.SAMPLE_VALUES[type(filter_).__name__]
+                filterset = filterset_class({name: value}, queryset=filterset_class._meta.model.objects.all())
+                with self.subTest(filter=f"{filterset_class.__name__}.{name}"):
+                    self.assertTrue(filterset.is_valid(), filterset.errors)
+                    scans = [line for line in self.plan(filterset.qs) if line.startswith("SCAN")]
+                    self.assertEqual(scans, [], self.plan(filterset.qs))
+                checked += 1
+        self.assertGreaterEqual(checked, 8)
+
+    def test_customer_orders_by_date(self):
+        plan = self.plan(Order.objects.filter(customer_id=1).order_by("-order_date"))
+        self.assertEqual([line for line in plan if "TEMP B-TREE" in line or line.startswith("SCAN")], [], plan)
+
+
+class GraphQLClientTests(CRMTestCase):
+    def test_runs_in_process(self):
+        # COUNT and the page; no HTTP, no introspection.
+        with self.assertNumQueries(2):
+            data = CRMClient().execute("query ($n: Int) { allProducts(first: $n) { edges { node { name } } } }", {"n": 2})
+        self.assertEqual(len(data["allProducts"]["edges"]), 2)
+
+    def test_mutations_and_errors(self):
+        data = CRMClient().execute("mutation { updateLowStockProducts(threshold: 1) { count } }")
+        self.assertEqual(data["updateLowStockProducts"]["count"], 1)
+        with self.assertRaisesMessage(GraphQLClientError, "Cannot query field 'nope'"):
+            CRMClient().execute("{ nope }")
+
+    def test_http_fallback_only_when_enabled(self):
+        with mock.patch.object(CRMClient, "execute_local", side_effect=RuntimeError("down")), \
+                mock.patch.object(CRMClient, "execute_http", return_value={"hello": "remote"}) as http:
+            with self.assertRaises(RuntimeError):
+                CRMClient(http_fallback=False).execute("{ hello }")
+            self.assertEqual(CRMClient(http_fallback=True).execute("{ hello }"), {"hello": "remote"})
+        http.assert_called_once_with("{ hello }", None, None)
+
+
+class OrderReminderTests(CRMTestCase):
+    def remind(self, **kwargs):
+        log = tempfile.NamedTemporaryFile("r", suffix=".log", delete=False)
+        self.addCleanup(os.unlink, log.name)
+        with warnings.catch_warnings():
+            # e.g. "DateTimeField Order.order_date received a naive datetime"
+            warnings.simplefilter("error", RuntimeWarning)
+            result = send_order_reminders(log_path=log.name, **kwargs)
+        with log:
+            return result, log.read().splitlines()
+
+    def test_only_new_orders_one_line_per_customer(self):
+        (orders, reminders), lines = self.remind(chunk_size=7)
+        self.assertEqual((orders, reminders, len(lines)), (20, 5, 5))
+        self.assertEqual(Watermark.objects.get(name=Watermark.ORDER_REMINDERS).value, Order.objects.latest("pk").pk)
+
+        self.assertEqual(self.remind()[0], (0, 0))
+        new = Order.objects.create(customer=self.customers[2])
+        (orders, reminders), lines = self.remind()
+        self.assertEqual((orders, reminders), (1, 1))
+        self.assertIn("customer2@example.com", lines[0])
+        self.assertEqual(Watermark.objects.get(name=Watermark.ORDER_REMINDERS).value, new.pk)
+
+    def test_reads_in_bounded_chunks(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.remind(chunk_size=5)
+        pages = [q for q in ctx.captured_queries if 'FROM "crm_order"' in q["sql"] and "LIMIT 6" in q["sql"]]
+        self.assertEqual(len(pages), 4)
+
+
+class CleanupInactiveCustomersTests(CRMTestCase):
+    def setUp(self):
+        super().setUp()
+        self.stale = timezone.now() - timedelta(days=400)
+        # Customers 0 and 1 went quiet a long time ago; customer 1 orders again.
+        Customer.objects.filter(pk__in=[self.customers[0].pk, self.customers[1].pk]).update(last_activity_at=self.stale)
+        Order.objects.create(customer=self.customers[1])
+
+    def cleanup(self, *args):
+        out = StringIO()
+        call_command("cleanup_inactive_customers", "--sleep", "0", *args, stdout=out)
+        return out.getvalue()
+
+    def test_new_orders_record_activity(self):
+        self.assertGreater(Customer.objects.get(pk=self.customers[1].pk).last_activity_at, self.stale)
+
+    def test_back_dated_orders_never_move_activity_backwards(self):
+        customer = Customer.objects.create(name="New", email="new@example.com")
+        result = execute(
+            'mutation ($c: ID!, $p: ID!) { createOrder(input: {customerId: $c, productIds: [$p], '
+            'orderDate: "2020-01-01T00:00:00+00:00"}) { errors } }',
+            {"c": customer.pk, "p": self.products[4].pk},
+        )
+        self.assertIsNone(result.data["createOrder"]["errors"])
+        self.assertGreater(Customer.objects.get(pk=customer.pk).last_activity_at, self.stale)
+        self.assertIn("Would delete 1 customers", self.cleanup("--dry-run"))
+
+    def test_bulk_orders_record_activity_at_their_order_date(self):
+        stale, active = self.customers[0], self.customers[2]
+        recent = timezone.now() - timedelta(days=3)
+        rows = [
+            {"customerId": str(stale.pk), "items": [{"productId": str(self.products[4].pk)}], "orderDate": recent.isoformat()},
+            {"customerId": str(active.pk), "items": [{"productId": str(self.products[4].pk)}], "orderDate": "2020-01-01T00:00:00+00:00"},
+        ]
+        result = execute(
+            "mutation ($input: [OrderInput!]!) { bulkCreateOrders(input: $input) { errors } }", {"input": rows},
+        )
+        self.assertEqual(result.data["bulkCreateOrders"]["errors"], [])
+        self.assertEqual(Customer.objects.get(pk=stale.pk).last_activity_at, recent)
+        self.assertGreater(Customer.objects.get(pk=active.pk).last_activity_at, recent)
+
+    def test_activity_is_recorded_in_batches(self):
+        recent = timezone.now() - timedelta(days=3)
+        with self.assertNumQueries(3):
+            Customer.touch({c.pk: recent for c in self.customers}, batch_size=2)
+        self.assertFalse(Customer.objects.filter(last_activity_at__lt=recent).exists())
+
+    def test_dry_run_deletes_nothing(self):
+        self.assertIn("Would delete 1 customers and 4 orders", self.cleanup("--dry-run"))
+        self.assertEqual(Customer.objects.count(), 5)
+
+    def test_deletes_in_batches_and_keeps_counters(self):
+        Customer.objects.bulk_create(
+            Customer(name=f"Old {i}", email=f"old{i}@example.com", last_activity_at=self.stale) for i in range(4)
+        )
+        counters.rebuild()
+        self.assertIn("Deleted customers: 5 in 3 batches", self.cleanup("--batch-size", "2"))
+        self.assertFalse(Customer.objects.filter(pk=self.customers[0].pk).exists())
+        self.assertEqual(counters.read(Counter.CUSTOMERS), Customer.objects.count())
+        self.assertEqual(counters.read(Counter.ORDERS), Order.objects.count())
+
+
+class DailySalesRollupTests(CRMTestCase):
+    REPORT = """
+        query {
+            salesReport {
+                orders revenue newCustomers
+                days { date orders products { units product { name } } }
+                topProducts(limit: 2) { units product { name } }
+            }
+        }
+    """
+
+    def setUp(self):
+        super().setUp()
+        for i, order in enumerate(Order.objects.order_by("pk")):
+            order.total_amount = Decimal(i)
+            order.save()
+        # One order from 3 days ago, outside "today".
+        Order.objects.filter(pk=Order.objects.order_by("pk").first().pk).update(
+            order_date=timezone.now() - timedelta(days=3)
+        )
+
+    def test_backfill_matches_raw_tables(self):
+        call_command("backfill_rollups", stdout=StringIO())
+        today = DailySalesRollup.objects.get(date=timezone.localdate())
+        self.assertEqual((today.orders, today.revenue, today.new_customers), (19, Decimal("190"), 5))
+        expected = {
+            str(row["product_id"]): row["units"]
+            for row in OrderItem.objects.exclude(order__order_date__lt=timezone.now() - timedelta(days=1))
+            .values("product_id").annotate(units=Sum("quantity"))
+        }
+        self.assertEqual(today.units_by_product, expected)
+        self.assertEqual(DailySalesRollup.objects.count(), 4)
+
+    def test_refresh_picks_up_changes(self):
+        refresh_recent()
+        Order.objects.filter(order_date__gte=timezone.now() - timedelta(days=1)).first().delete()
+        refresh_recent()
+        self.assertEqual(DailySalesRollup.objects.get(date=timezone.localdate()).orders, 18)
+
+    def test_refresh_picks_up_back_dated_writes(self):
+        refresh_recent()
+        day = timezone.localdate() - timedelta(days=10)
+        result = execute(
+            "mutation ($c: ID!, $p: ID!, $d: DateTime) { createOrder(input: {customerId: $c, productIds: [$p], orderDate: $d}) "
+            "{ order { id } errors } }",
+            {"c": self.customers[0].pk, "p": self.products[4].pk, "d": (timezone.now() - timedelta(days=10)).isoformat()},
+        )
+        self.assertIsNone(result.data["createOrder"]["errors"])
+        refresh_recent()
+        self.assertEqual(DailySalesRollup.objects.get(date=day).orders, 1)
+
+        Order.objects.get(pk=schema_pk(result.data["createOrder"]["order"]["id"])).delete()
+        refresh_recent()
+        rollup = DailySalesRollup.objects.get(date=day)
+        self.assertEqual((rollup.orders, rollup.stale), (0, False))
+
+    def test_recent_writes_flag_nothing_and_deletes_flag_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            Order.objects.create(customer=self.customers[0])
+        self.assertFalse([q for q in ctx.captured_queries if "crm_dailysalesrollup" in q["sql"]])
+
+        old = timezone.now() - timedelta(days=30)
+        Order.objects.filter(customer=self.customers[1]).update(order_date=old)
+        with CaptureQueriesContext(connection) as ctx:
+            self.customers[1].delete()  # 4 orders on one old day
+        flags = [q for q in ctx.captured_queries if "crm_dailysalesrollup" in q["sql"]]
+        self.assertEqual(len(flags), 1)
+        self.assertTrue(DailySalesRollup.objects.get(date=timezone.localdate(old)).stale)
+
+    def test_report_reads_rollups_only(self):
+        call_command("backfill_rollups", stdout=StringIO())
+        # The rollup rows, then one batched product lookup.
+        with self.assertNumQueries(2):
+            result = execute(self.REPORT)
+        self.assertIsNone(result.errors)
+        report = result.data["salesReport"]
+        self.assertEqual((report["orders"], report["revenue"], report["newCustomers"]), (20, "190.00", 5))
+        self.assertEqual([p["product"]["name"] for p in report["topProducts"]], ["Product 0", "Product 1"])
+        # Quiet days in between are rolled up as zeros.
+        self.assertEqual([day["orders"] for day in report["days"]], [1, 0, 0, 19])
+
+
+class SeedCommandTests(TestCase):
+    def seed(self, *args):
+        out = StringIO()
+        call_command("seed", "--customers", "30", "--products", "10", "--orders", "50", "--workers", "1", *args, stdout=out)
+        return out.getvalue()
+
+    def test_bulk_seed_is_consistent(self):
+        out = self.seed("--seed", "3", "--batch-size", "20")
+        self.assertIn("rows/s", out)
+        self.assertEqual((Customer.objects.count(), Product.objects.count(), Order.objects.count()), (30, 10, 50))
+        for order in Order.objects.prefetch_related("items__product"):
+            self.assertEqual(order.total_amount, sum(i.product.price * i.quantity for i in order.items.all()))
+        self.assertEqual(counters.read(Counter.ORDERS), 50)
+        self.assertEqual(counters.read(Counter.REVENUE), Order.objects.aggregate(t=Sum("total_amount"))["t"])
+        # last_activity_at is set in --batch-size chunks of customers.
+        for customer in Customer.objects.filter(orders__isnull=False).annotate(latest=Max("orders__order_date")):
+            self.assertEqual(customer.last_activity_at, customer.latest)
+
+    def test_seed_flag_is_deterministic(self):
+        def snapshot():
+            return (
+                list(Customer.objects.order_by("pk").values_list("name", "email", "phone", "created_at", "last_activity_at")),
+                list(Order.objects.order_by("pk").values_list("order_date", "total_amount")),
+                list(OrderItem.objects.order_by("pk").values_list("product__name", "quantity")),
+            )
+
+        self.seed("--seed", "42")
+        first = snapshot()
+        for model in (OrderItem, Order, Customer, Product):
+            model.objects.all().delete()
+        self.seed("--seed", "42", "--batch-size", "7")
+        self.assertEqual(snapshot(), first)
+        self.assertLess(first[1][0][0], SEED_EPOCH)
+
+
+class BenchGraphQLTests(TestCase):
+    def bench(self, *args):
+        out = StringIO()
+        call_command(
+            "bench_graphql", "--customers", "20", "--products", "10", "--orders", "40",
+            "--repeat", "2", "--warmup", "0", "--seed", "1", *args, stdout=out,
+        )
+        return out.getvalue()
+
+    def test_writes_results_and_flags_query_regressions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.json")
+            self.bench("--output", path)
+            with open(path) as f:
+                report = json.load(f)
+            self.assertEqual(
+                set(report["operations"]),
+                {"allOrders", "products", "bulkCreateCustomers", "createOrder", "updateLowStockProducts"},
+            )
+            all_orders = report["operations"]["allOrders"]
+            self.assertEqual(all_orders["queries"], 3)
+            self.assertGreater(all_orders["rows"], 0)
+            self.assertLessEqual(all_orders["p50_ms"], all_orders["p99_ms"])
+            # Temporary rows and every mutation are rolled back.
+            self.assertEqual(Customer.objects.count(), 0)
+
+            report["operations"]["allOrders"]["queries"] = 2
+            with open(path, "w") as f:
+                json.dump(report, f)
+            with self.assertRaisesMessage(CommandError, "regression"):
+                self.bench("--operation", "allOrders", "--baseline", path, "--threshold", "1000")
+
+
+class TracingTests(CRMTestCase):
+    QUERY = "{ allOrders(first: 10) { edges { node { id customer { name } } } } }"
+
+    def setUp(self):
+        super().setUp()
+        trace_stats.clear()
+
+    def post(self, query=QUERY, **headers):
+        body = json.dumps({"query": query})
+        return self.client.post("/graphql", body, content_type="application/json", **headers).json()
+
+    @override_settings(DEBUG=True)
+    def test_trace_in_extensions_with_header(self):
+        tracing = self.post(HTTP_X_GRAPHQL_TRACE="1")["extensions"]["tracing"]
+        paths = {r["path"]: r for r in tracing["resolvers"]}
+        self.assertEqual(paths["allOrders.edges.*.node.customer"]["calls"], 10)
+        self.assertEqual(paths["allOrders.edges.*.node.customer"]["field"], "OrderType.customer")
+        # Count and page (customers joined in); nothing per row.
+        self.assertEqual([(q["path"], q["count"]) for q in tracing["sql"]], [("allOrders", 1), ("allOrders", 1)])
+        self.assertEqual(tracing["queries"], 2)
+        self.assertEqual(tracing["nPlusOne"], [])
+
+    @override_settings(DEBUG=True)
+    def test_page_without_customer_reads_no_deferred_fields(self):
+        query = "{ allOrders(first: 10) { edges { node { id products { edges { node { name } } } } } } }"
+        tracing = self.post(query, HTTP_X_GRAPHQL_TRACE="1")["extensions"]["tracing"]
+        self.assertEqual(tracing["queries"], 3)
+        self.assertEqual(tracing["nPlusOne"], [])
+
+    @override_settings(DEBUG=True)
+    def test_flags_n_plus_one(self):
+        # No join and no batching: every customer is fetched on its own.
+        with mock.patch("crm.fields.optimize", lambda qs, info: qs), \
+                mock.patch.object(Loaders, "prepare", lambda self, model, instances: instances):
+            tracing = self.post(HTTP_X_GRAPHQL_TRACE="1")["extensions"]["tracing"]
+        [finding] = tracing["nPlusOne"]
+        self.assertEqual(finding["path"], "allOrders.edges.*.node.customer")
+        self.assertEqual(finding["count"], 5)  # one per distinct customer on the page
+        self.assertIn("crm_customer", finding["sql"])
+
+    def test_aggregated_without_header(self):
+        self.assertNotIn("tracing", self.post()["extensions"])
+        # Not DEBUG and not staff: the header is ignored.
+        self.assertNotIn("tracing", self.post(HTTP_X_GRAPHQL_TRACE="1")["extensions"])
+        stats = self.client.get("/graphql/traces").json()
+        self.assertEqual(stats["requests"], 2)
+        self.assertEqual(stats["fields"]["OrderType.customer"]["calls"], 20)
+        self.assertEqual(stats["fields"]["Query.allOrders"]["queries"], 4)
+
+
+class MetricsTests(CRMTestCase):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(CRM_METRICS_DIR=tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def scrape(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        return response.content.decode()
+
+    def test_operations_resolvers_and_caches(self):
+        body = json.dumps({"query": "query Page { allOrders(first: 5) { edges { node { id customer { name } } } } }"})
+        for _ in range(2):
+            self.client.post("/graphql", body, content_type="application/json")
+        text = self.scrape()
+        self.assertIn('crm_graphql_operations_total{operation="Page",type="query",status="ok"} 2', text)
+        self.assertIn('crm_graphql_operation_duration_seconds_count{operation="Page",type="query"} 2', text)
+        self.assertIn('crm_graphql_operation_duration_seconds_bucket{operation="Page",type="query",le="+Inf"} 2', text)
+        self.assertIn('crm_graphql_resolver_duration_seconds_count{field="OrderType.customer"} 10', text)
+        self.assertIn('crm_graphql_db_queries_total{operation="Page"} 4', text)
+        self.assertIn('crm_cache_requests_total{cache="document",result="hit"} 1', text)
+        self.assertIn('crm_cache_requests_total{cache="document",result="miss"} 1', text)
+
+    def test_jobs(self):
+        with track_job("update_low_stock") as run:
+            run.rows = 7
+        with self.assertRaises(ValueError), track_job("update_low_stock"):
+            raise ValueError
+        text = self.scrape()
+        self.assertIn('crm_job_runs_total{job="update_low_stock",status="ok"} 1', text)
+        self.assertIn('crm_job_runs_total{job="update_low_stock",status="error"} 1', text)
+        self.assertIn('crm_job_rows_total{job="update_low_stock"} 7', text)
+        self.assertIn('crm_job_duration_seconds_count{job="update_low_stock"} 2', text)
+        self.assertIn('crm_job_last_success_timestamp_seconds{job="update_low_stock"}', text)
+
+    def test_sums_across_processes(self):
+        JOB_ROWS.inc(2, job="import")
+        # A forked worker writes to a file of its own.
+        process = multiprocessing.get_context("fork").Process(target=JOB_ROWS.inc, args=(3,), kwargs={"job": "import"})
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+        self.assertIn('crm_job_rows_total{job="import"} 5', self.scrape())
+
+
+class SQLiteProfileTests(TestCase):
+    def test_pragmas_and_immediate_transactions(self):
+        with connection.cursor() as cursor:
+            for pragma, expected in (("busy_timeout", 5000), ("synchronous", 1), ("cache_size", -64000), ("temp_store", 2)):
+                cursor.execute(f"PRAGMA {pragma}")
+                self.assertEqual(cursor.fetchone()[0], expected, pragma)
+        self.assertEqual(connection.transaction_mode, "IMMEDIATE")
@@ -0,0 +1,238 @@
+"""Per-request resolver timing, SQL by field path, and N+1 detection.
+
+``TracingMiddleware`` is enabled through ``GRAPHENE["MIDDLEWARE"]``. It times
+every resolver except leaf fields below the root, and a database execute
+wrapper files each query under the field path that was resolving when it
+ran. Paths are normalised (list indexes become ``*``), so the same query
+shape issued once per list item adds up under one path. A shape repeated
+``GRAPHQL_N_PLUS_ONE_THRESHOLD`` times under a path, whether by the items
+of a list or by a loop inside one resolver, is reported as an N+1.
+
+A request with an ``X-GraphQL-Trace`` header gets its trace back under
+``extensions.tracing``; only when ``DEBUG`` is on or the user is staff,
+since it contains SQL. Every trace is also added to ``trace_stats``,
+served at ``/graphql/traces``, and to the histograms in ``crm.metrics``.
+"""
+import functools
+import inspect
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import QuerySet
+from graphql import get_named_type, is_leaf_type
+
+from . import metrics
+from .aio import in_event_loop
+
+TRACE_HEADER = "HTTP_X_GRAPHQL_TRACE"
+
+# (trace, path, field) of the resolver running in this thread or task.
+_current = ContextVar("crm_tracing", default=None)
+
+
+def n_plus_one_threshold():
+    return getattr(settings, "GRAPHQL_N_PLUS_ONE_THRESHOLD", 3)
+
+
+@functools.lru_cache(maxsize=None)
+def is_leaf_field(return_type):
+    return is_leaf_type(get_named_type(return_type))
+
+
+def path_key(path):
+    return ".".join("*" if isinstance(key, int) else key for key in path.as_list())
+
+
+def trace_sql(execute, sql, params, many, context):
+    state = _current.get()
+    if state is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        trace, path, field = state
+        trace.add_sql(path, field, sql, time.perf_counter() - start)
+
+
+def install(connection):
+    # First in the list, so wrappers pushed and popped by execute_wrapper()
+    # blocks (QueryRecorder, ...) still pop their own.
+    if trace_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, trace_sql)
+
+
+class Trace:
+    def __init__(self):
+        self.start = time.perf_counter()
+        # path -> [field, calls, total seconds, max seconds]
+        self.resolvers = {}
+        # field -> every call's seconds, for the resolver latency histogram
+        self.durations = defaultdict(list)
+        # (path, sql) -> [field, count, total seconds]
+        self.sql = {}
+        self._lock = threading.Lock()
+
+    def add_resolver(self, path, field, elapsed):
+        with self._lock:
+            entry = self.resolvers.setdefault(path, [field, 0, 0.0, 0.0])
+            entry[1] += 1
+            entry[2] += elapsed
+            entry[3] = max(entry[3], elapsed)
+            self.durations[field].append(elapsed)
+
+    def add_sql(self, path, field, sql, elapsed):
+        with self._lock:
+            entry = self.sql.setdefault((path, sql), [field, 0, 0.0])
+            entry[1] += 1
+            entry[2] += elapsed
+
+    def n_plus_one(self):
+        threshold = n_plus_one_threshold()
+        return [
+            {"path": path, "field": field, "sql": sql, "count": count}
+            for (path, sql), (field, count, _) in self.sql.items()
+            if count >= threshold
+        ]
+
+    def report(self):
+        return {
+            "durationMs": round((time.perf_counter() - self.start) * 1000, 3),
+            "queries": sum(count for _, count, _ in self.sql.values()),
+            "dbMs": round(sum(elapsed for _, _, elapsed in self.sql.values()) * 1000, 3),
+            "resolvers": [
+                {
+                    "path": path,
+                    "field": field,
+                    "calls": calls,
+                    "totalMs": round(total * 1000, 3),
+                    "maxMs": round(longest * 1000, 3),
+                }
+                for path, (field, calls, total, longest) in self.resolvers.items()
+            ],
+            "sql": [
+                {"path": path, "field": field, "sql": sql, "count": count, "totalMs": round(elapsed * 1000, 3)}
+                for (path, sql), (field, count, elapsed) in self.sql.items()
+            ],
+            "nPlusOne": self.n_plus_one(),
+        }
+
+
+class TraceStats:
+    """Process-wide totals of every finished trace, by field."""
+
+    max_n_plus_one = 256
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.requests = 0
+            self._fields = defaultdict(lambda: {"calls": 0, "totalMs": 0.0, "maxMs": 0.0, "queries": 0, "dbMs": 0.0})
+            self._n_plus_one = {}
+
+    def record(self, trace):
+        with self._lock:
+            self.requests += 1
+            for field, calls, total, longest in trace.resolvers.values():
+                entry = self._fields[field]
+                entry["calls"] += calls
+                entry["totalMs"] += total * 1000
+                entry["maxMs"] = max(entry["maxMs"], longest * 1000)
+            for field, count, elapsed in trace.sql.values():
+                entry = self._fields[field]
+                entry["queries"] += count
+                entry["dbMs"] += elapsed * 1000
+            for finding in trace.n_plus_one():
+                key = (finding["path"], finding["sql"])
+                if key not in self._n_plus_one and len(self._n_plus_one) >= self.max_n_plus_one:
+                    continue
+                count = finding.pop("count")
+                entry = self._n_plus_one.setdefault(key, {**finding, "requests": 0, "maxCount": 0})
+                entry["requests"] += 1
+                entry["maxCount"] = max(entry["maxCount"], count)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "fields": {
+                    field: {**entry, "totalMs": round(entry["totalMs"], 3), "maxMs": round(entry["maxMs"], 3), "dbMs": round(entry["dbMs"], 3)}
+                    for field, entry in sorted(self._fields.items())
+                },
+                "nPlusOne": sorted(self._n_plus_one.values(), key=lambda f: -f["requests"]),
+            }
+
+
+trace_stats = TraceStats()
+
+
+def wants_trace(request):
+    if not request.META.get(TRACE_HEADER):
+        return False
+    user = getattr(request, "user", None)
+    return settings.DEBUG or bool(getattr(user, "is_staff", False))
+
+
+def finish(context, operation="anonymous"):
+    """Close the trace of ``context``; return its report if the client asked for it."""
+    trace = getattr(context, "crm_trace", None)
+    if trace is None:
+        return None
+    del context.crm_trace
+    trace_stats.record(trace)
+    metrics.record_trace(
+        operation,
+        trace.durations,
+        db_seconds=sum(elapsed for _, _, elapsed in trace.sql.values()),
+        queries=sum(count for _, count, _ in trace.sql.values()),
+        n_plus_one_fields={finding["field"] for finding in trace.n_plus_one()},
+    )
+    meta = getattr(context, "META", None)
+    if meta is not None and wants_trace(context):
+        return trace.report()
+    return None
+
+
+class TracingMiddleware:
+    def resolve(self, next, root, info, **args):
+        if info.path.prev is not None and is_leaf_field(info.return_type):
+            return next(root, info, **args)
+
+        trace = getattr(info.context, "crm_trace", None)
+        if trace is None:
+            for connection in connections.all():
+                install(connection)
+            trace = info.context.crm_trace = Trace()
+
+        path = path_key(info.path)
+        field = f"{info.parent_type.name}.{info.field_name}"
+        token = _current.set((trace, path, field))
+        start = time.perf_counter()
+        try:
+            result = next(root, info, **args)
+            if isinstance(result, QuerySet) and not in_event_loop():
+                # Evaluate here rather than while the list is completed, so the
+                # query is timed and filed under this field.
+                result._fetch_all()
+        finally:
+            _current.reset(token)
+        if inspect.isawaitable(result):
+            return self._traced(result, trace, path, field, start)
+        trace.add_resolver(path, field, time.perf_counter() - start)
+        return result
+
+    @staticmethod
+    async def _traced(result, trace, path, field, start):
+        token = _current.set((trace, path, field))
+        try:
+            return await result
+        finally:
+            _current.reset(token)
+            trace.add_resolver(path, field, time.perf_counter() - start)
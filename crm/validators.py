@@ -0,0 +1,25 @@
+"""Input rules shared by the create mutations and ``manage.py import_crm``."""
+import re
+from decimal import Decimal, InvalidOperation
+
+PHONE_RE = re.compile(r"^\+?\d{1,3}[- ]?\d{3,}[- ]?\d{3,}$")
+
+
+def customer_errors(phone):
+    if phone and not PHONE_RE.match(phone):
+        return [f"Invalid phone format: {phone}"]
+    return []
+
+
+def product_errors(price, stock):
+    """Return ``(price as Decimal or None, errors)`` for a product's price and stock."""
+    errors = []
+    try:
+        price = Decimal(str(price))
+    except (InvalidOperation, ValueError):
+        return None, ["Invalid price format. Must be a valid number."]
+    if not price.is_finite() or price <= 0:
+        errors.append("Price must be positive.")
+    if stock < 0:
+        errors.append("Stock cannot be negative.")
+    return price, errors
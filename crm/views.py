@@ -1,3 +1,466 @@
-from django.shortcuts import render
+import csv
+import hashlib
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Prefetch
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBadRequest
+from django.views.generic import View
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.utils.utils import set_rollback
+from graphene_django.views import GraphQLView, HttpError
+from graphql import ExecutionResult, OperationType, execute, get_operation_ast, parse, validate_schema
+from graphql.error import GraphQLError
+from graphql.validation import validate
+
+from . import metrics, tracing
+from .caching import result_cache_stats
+from .cost import query_cost_rule
+from .filters import OrderFilter
+from .models import Order, OrderItem
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+class DocumentCache:
+    """Thread-safe LRU of parsed *and* validated documents keyed by query hash."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.CACHE_REQUESTS.inc(cache="document", result="hit")
+                return entry
+            self.misses += 1
+        metrics.CACHE_REQUESTS.inc(cache="document", result="miss")
+        # Parse/validate outside the lock; a racing duplicate is harmless.
+        entry = build()
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class PersistedQueries:
+    """Automatic persisted queries (Apollo APQ protocol) stored in Django's cache."""
+
+    def __init__(self, cache_alias, timeout):
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.registered = 0
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def lookup(self, sha256):
+        query = self.cache.get(f"apq:{sha256}")
+        if query is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        metrics.CACHE_REQUESTS.inc(cache="persisted_query", result="miss" if query is None else "hit")
+        return query
+
+    def register(self, sha256, query):
+        self.cache.set(f"apq:{sha256}", query, self.timeout)
+        self.registered += 1
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "registered": self.registered}
+
+
+document_cache = DocumentCache(getattr(settings, "GRAPHQL_DOCUMENT_CACHE_SIZE", 256))
+persisted_queries = PersistedQueries(
+    getattr(settings, "GRAPHQL_PERSISTED_QUERY_CACHE", "default"),
+    getattr(settings, "GRAPHQL_PERSISTED_QUERY_TIMEOUT", None),
+)
+
+
+def persisted_query_hash(request, data):
+    extensions = request.GET.get("extensions") or data.get("extensions") or {}
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+    persisted = extensions.get("persistedQuery") or {}
+    return persisted.get("sha256Hash")
+
+
+class CRMGraphQLView(GraphQLView):
+    """GraphQLView that caches validated documents and supports persisted queries.
+
+    Validation only depends on the document and the schema, so a document that
+    was valid once is valid for every request with the same query text. The
+    query cost check depends on variables and runs on every request; its result
+    is returned under ``extensions.cost``.
+    """
+
+    def get_graphql_params(self, request, data):
+        query, variables, operation_name, id = super().get_graphql_params(request, data)
+        sha256 = persisted_query_hash(request, data)
+        if sha256:
+            if query:
+                if query_hash(query) != sha256:
+                    raise HttpError(HttpResponseBadRequest("provided sha does not match query"))
+                persisted_queries.register(sha256, query)
+            else:
+                query = persisted_queries.lookup(sha256)
+                request.persisted_query_not_found = query is None
+        return query, variables, operation_name, id
+
+    def get_document(self, query):
+        """Return ``(document, errors)`` for ``query``, parsing and validating once."""
+        schema = self.schema.graphql_schema
+
+        def build():
+            try:
+                document = parse(query)
+            except GraphQLError as e:
+                return None, [e]
+            errors = validate(
+                schema,
+                document,
+                self.validation_rules,
+                graphene_settings.MAX_VALIDATION_ERRORS,
+            )
+            return document, errors
+
+        key = (id(schema), tuple(self.validation_rules or ()), query_hash(query))
+        return document_cache.get(key, build)
+
+    def prepare_request(self, request, query, variables, operation_name, show_graphiql=False):
+        """Everything that happens before execution.
+
+        Returns ``(result, plan)``: ``result`` short-circuits the request (an
+        error, or ``None`` to render GraphiQL); otherwise ``plan`` holds the
+        document, operation and execute() options.
+        """
+        if not query:
+            if getattr(request, "persisted_query_not_found", False):
+                return ExecutionResult(errors=[GraphQLError("PersistedQueryNotFound")]), None
+            if show_graphiql:
+                return None, None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema = self.schema.graphql_schema
+
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors), None
+
+        document, errors = self.get_document(query)
+        if document is None:
+            return ExecutionResult(errors=errors), None
+
+        operation_ast = get_operation_ast(document, operation_name)
+
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None, None
+
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(
+                        operation_ast.operation.value
+                    ),
+                )
+            )
+
+        if errors:
+            return ExecutionResult(data=None, errors=errors), None
+
+        cost = {}
+        if operation_ast is not None:
+            rule = query_cost_rule(operation_ast, variables, cost)
+            errors = validate(schema, document, [rule])
+            if errors:
+                return ExecutionResult(data=None, errors=errors, extensions={"cost": cost}), None
+
+        execute_options = {
+            "root_value": self.get_root_value(request),
+            "context_value": self.get_context(request),
+            "variable_values": variables,
+            "operation_name": operation_name,
+            "middleware": self.get_middleware(request),
+        }
+        if self.execution_context_class:
+            execute_options["execution_context_class"] = self.execution_context_class
+
+        is_mutation = operation_ast is not None and operation_ast.operation == OperationType.MUTATION
+        return None, (document, is_mutation, cost, execute_options)
+
+    def execute_plan(self, request, plan):
+        document, is_mutation, cost, execute_options = plan
+        schema = self.schema.graphql_schema
+        started = time.perf_counter()
+        try:
+            if is_mutation and (
+                graphene_settings.ATOMIC_MUTATIONS is True
+                or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+            ):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+            else:
+                result = execute(schema, document, **execute_options)
+        except Exception as e:
+            result = ExecutionResult(errors=[e])
+        return self.finish_result(result, plan, started)
+
+    @staticmethod
+    def finish_result(result, plan, started):
+        document, is_mutation, cost, execute_options = plan
+        if cost:
+            result.extensions = {**(result.extensions or {}), "cost": cost}
+        operation_ast = get_operation_ast(document, execute_options["operation_name"])
+        operation = metrics.operation_label(operation_ast.name.value if operation_ast and operation_ast.name else None)
+        kind = operation_ast.operation.value if operation_ast else "unknown"
+        metrics.record_operation(operation, kind, not result.errors, time.perf_counter() - started)
+        trace = tracing.finish(execute_options["context_value"], operation)
+        if trace:
+            result.extensions = {**(result.extensions or {}), "tracing": trace}
+        return result
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        result, plan = self.prepare_request(request, query, variables, operation_name, show_graphiql)
+        if plan is None:
+            return result
+        return self.execute_plan(request, plan)
+
+    def get_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        return self.encode_result(request, execution_result, id, show_graphiql)
+
+    def encode_result(self, request, execution_result, id=None, show_graphiql=False):
+        # Same as the tail of GraphQLView.get_response, plus the result's ``extensions``.
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+
+        status_code = 200
+        if execution_result:
+            response = {}
+
+            if execution_result.errors:
+                set_rollback()
+                response["errors"] = [
+                    self.format_error(e) for e in execution_result.errors
+                ]
+
+            if execution_result.errors and any(
+                not getattr(e, "path", None) for e in execution_result.errors
+            ):
+                status_code = 400
+            else:
+                response["data"] = execution_result.data
+
+            if execution_result.extensions:
+                response["extensions"] = execution_result.extensions
+
+            if self.batch:
+                response["id"] = id
+                response["status"] = status_code
+
+            result = self.json_encode(request, response, pretty=show_graphiql)
+        else:
+            result = None
+
+        return result, status_code
+
+
+class AsyncCRMGraphQLView(CRMGraphQLView):
+    """CRMGraphQLView for ASGI: queries run on graphql-core's async executor.
+
+    Root fields return awaitables (async ORM iteration, loaders batching in
+    ``sync_to_async``), so independent root fields resolve concurrently and no
+    worker thread is held while a query waits on the database. Mutations keep
+    their transactional sync path and run in a thread. GraphiQL and batching
+    stay on the sync view.
+    """
+
+    graphiql = False
+    batch = False
+
+    def dispatch(self, request, *args, **kwargs):
+        return View.dispatch(self, request, *args, **kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            data = self.parse_body(request)
+            query, variables, operation_name, id = self.get_graphql_params(request, data)
+            execution_result, plan = self.prepare_request(request, query, variables, operation_name)
+            if plan is not None:
+                execution_result = await self.execute_plan_async(request, plan)
+            result, status_code = self.encode_result(request, execution_result, id)
+            return HttpResponse(status=status_code, content=result, content_type="application/json")
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(request, {"errors": [self.format_error(e)]})
+            return response
+
+    post = get
+
+    async def execute_plan_async(self, request, plan):
+        document, is_mutation, cost, execute_options = plan
+        if is_mutation:
+            return await sync_to_async(self.execute_plan)(request, plan)
+        started = time.perf_counter()
+        try:
+            result = execute(self.schema.graphql_schema, document, **execute_options)
+            if inspect.isawaitable(result):
+                result = await result
+        except Exception as e:
+            result = ExecutionResult(errors=[e])
+        return self.finish_result(result, plan, started)
+
+
+def graphql_trace_stats(request):
+    """Resolver and SQL totals collected by ``TracingMiddleware`` in this process."""
+    return JsonResponse(tracing.trace_stats.stats())
+
+
+def graphql_cache_stats(request):
+    return JsonResponse({
+        "documents": document_cache.stats(),
+        "persisted_queries": persisted_queries.stats(),
+        "results": result_cache_stats.stats(),
+    })
+
+
+EXPORT_COLUMNS = ["id", "order_date", "customer_id", "customer_name", "customer_email", "total_amount", "products"]
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back to the csv writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size):
+    """Yield one dict per order, reading ``chunk_size`` orders (and their lines) at a time."""
+    queryset = (
+        queryset
+        .select_related("customer")
+        .only("id", "order_date", "total_amount", "customer__name", "customer__email")
+        .prefetch_related(Prefetch(
+            "items",
+            queryset=OrderItem.objects.select_related("product").only("order_id", "quantity", "product__name").order_by("pk"),
+        ))
+        .order_by("pk")
+    )
+    # One streamed query for the orders, plus one prefetch per chunk of them.
+    for order in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            "id": order.pk,
+            "order_date": order.order_date,
+            "customer_id": order.customer_id,
+            "customer_name": order.customer.name,
+            "customer_email": order.customer.email,
+            "total_amount": order.total_amount,
+            "products": [
+                {"name": item.product.name, "quantity": item.quantity} for item in order.items.all()
+            ],
+        }
+
+
+def export_orders(request):
+    """Stream orders as CSV (default) or NDJSON (``?format=ndjson``).
+
+    Accepts the ``OrderFilter`` parameters (``total_amount__gte``,
+    ``customer_name``, ``product_name``, ...) and ``chunk_size``.
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    fmt = request.GET.get("format", "csv")
+    if fmt not in ("csv", "ndjson"):
+        return HttpResponseBadRequest("format must be csv or ndjson")
+    try:
+        chunk_size = min(max(int(request.GET.get("chunk_size", 2000)), 1), 10_000)
+    except ValueError:
+        return HttpResponseBadRequest("chunk_size must be an integer")
+
+    filterset = OrderFilter(request.GET, queryset=Order.objects.all())
+    if not filterset.is_valid():
+        return JsonResponse({"errors": filterset.errors}, status=400)
+    queryset = filterset.qs
+    if {"product_name", "product_id"} & set(request.GET):
+        # Product filters join the through table and can repeat an order.
+        queryset = queryset.distinct()
+    rows = export_rows(queryset, chunk_size)
+
+    if fmt == "ndjson":
+        lines = (json.dumps(row, cls=DjangoJSONEncoder) + "\n" for row in rows)
+        content_type = "application/x-ndjson"
+    else:
+        writer = csv.writer(_Echo())
+
+        def csv_lines():
+            yield writer.writerow(EXPORT_COLUMNS)
+            for row in rows:
+                row["products"] = "; ".join(
+                    p["name"] if p["quantity"] == 1 else f"{p['name']} x{p['quantity']}" for p in row["products"]
+                )
+                yield writer.writerow([row[column] for column in EXPORT_COLUMNS])
+
+        lines = csv_lines()
+        content_type = "text/csv"
+
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="orders.{fmt}"'
+    return response